@@ -0,0 +1,43 @@
+"""
+Gunicorn Configuration
+Production server: multiple Uvicorn workers behind one Gunicorn master
+
+Run with:
+    gunicorn -c backend/api/gunicorn_conf.py backend.api.main:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+
+# One worker per core (plus headroom) so a slow request never stalls the whole API.
+# UvicornWorker picks up uvloop and httptools automatically when installed.
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+
+timeout = 120
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Create the schema once in the master, before any worker boots or restarts"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    from backend.db.database import init_db, engine
+    init_db()
+    # Forked workers must not inherit the master's open connections
+    engine.dispose()
+    # Inherited by every worker, whose lifespan then skips init_db
+    os.environ["DB_SCHEMA_READY"] = "1"
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's metric files when metrics run in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -4,71 +4,112 @@ FastAPI Main Application
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 from dotenv import load_dotenv
+import redis.asyncio as aioredis
 
 # Load environment variables FIRST
 load_dotenv()
 
 from .routes import router
-from ..db.database import init_db
+from .metrics import metrics_app, record_request_latency, instrument_engine
+from ..db.database import init_db, warm_pool, async_engine
 from ..utils.logger import setup_logger
 from ..services.service_manager import AIServiceManager
 
 # Setup logging
 logger = setup_logger("ai_visibility_api", level="INFO")
 
-# Create FastAPI app
-app = FastAPI(
-    title="AI Visibility Score Tracker API",
-    description="Track brand visibility across AI models (ChatGPT, Claude, Perplexity, Gemini)",
-    version="1.0.0"
-)
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routes
-app.include_router(router, prefix="/api/v1", tags=["Analysis"])
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and services on startup"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database and services on startup, release them on shutdown"""
     logger.info("🚀 Starting AI Visibility Score Tracker...")
     
-    # Initialize database
-    logger.info("📊 Initializing database...")
-    init_db()
+    # Shared async Redis client (bounded pool) for caching, progress and locks
+    app.state.redis = aioredis.Redis(
+        connection_pool=aioredis.ConnectionPool.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+        )
+    )
+    
+    # Schema first, so no pooled connection touches tables still being created.
+    # Under Gunicorn the master already created it (on_starting)
+    if not os.getenv("DB_SCHEMA_READY"):
+        logger.info("📊 Initializing database...")
+        await asyncio.to_thread(init_db)
     
-    # Initialize AI services and validate API keys
+    # Pool warm-up and API key probes are independent, so run them concurrently
     logger.info("🔑 Validating API keys...")
     service_manager = AIServiceManager()
-    available_models = service_manager.get_available_models()
+    _, key_status = await asyncio.gather(
+        warm_pool(),
+        service_manager.validate_all_keys_async()
+    )
+    await service_manager.aclose()
+    available_models = [model for model, valid in key_status.items() if valid]
     
     if not available_models:
         logger.error("❌ No AI API keys configured! Please add keys to .env file")
         logger.error("   Required: OPENAI_API_KEY or GOOGLE_API_KEY")
     else:
-        logger.info(f"✅ Available AI models: {', '.join(available_models)}")
+        logger.info("✅ Available AI models: %s", ", ".join(available_models), extra={"models": available_models})
     
     # Validate critical environment variables
     required_vars = ["DATABASE_URL"]
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
-        logger.warning(f"⚠️  Missing optional environment variables: {', '.join(missing_vars)}")
+        logger.warning("⚠️  Missing optional environment variables: %s", ', '.join(missing_vars))
     
     logger.info("✅ Application started successfully")
-    logger.info(f"📍 API available at: http://localhost:{os.getenv('PORT', 8000)}")
-    logger.info(f"📖 Docs available at: http://localhost:{os.getenv('PORT', 8000)}/docs")
+    logger.info("📍 API available at: http://localhost:%s", os.getenv('PORT', 8000))
+    logger.info("📖 Docs available at: http://localhost:%s/docs", os.getenv('PORT', 8000))
+    
+    yield
+    
+    # Release shared connections on shutdown
+    await app.state.redis.close()
+    await app.state.redis.connection_pool.disconnect()
+
+
+# Create FastAPI app
+app = FastAPI(
+    title="AI Visibility Score Tracker API",
+    description="Track brand visibility across AI models (ChatGPT, Claude, Perplexity, Gemini)",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# CORS middleware
+# Explicit origins (a wildcard is invalid alongside credentials); browsers cache preflights for a day
+ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=ALLOWED_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
+)
+
+# Latency metrics for requests and database statements, scraped from /metrics
+app.middleware("http")(record_request_latency)
+instrument_engine(async_engine.sync_engine)
+app.mount("/metrics", metrics_app)
+
+# Include routes
+app.include_router(router, prefix="/api/v1", tags=["Analysis"])
 
 
 @app.get("/")
@@ -97,10 +138,10 @@ async def health_check():
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler with logging"""
-    logger.error(f"❌ Unhandled exception: {type(exc).__name__}: {str(exc)}")
-    logger.error(f"   Request: {request.method} {request.url}")
+    logger.error("❌ Unhandled exception: %s: %s", type(exc).__name__, exc)
+    logger.error("   Request: %s %s", request.method, request.url)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -111,6 +152,8 @@ async def global_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    # Development server only; production runs under Gunicorn (see api/gunicorn_conf.py)
+    import sys
     import uvicorn
     
     port = int(os.getenv("PORT", 8000))
@@ -118,5 +161,8 @@ if __name__ == "__main__":
         "backend.api.main:app",
         host="0.0.0.0",
         port=port,
+        # uvloop has no Windows build, fall back to the default loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         reload=True
     )
@@ -0,0 +1,81 @@
+"""
+Prometheus Metrics
+Request, database and Redis latency histograms, exposed at /metrics
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import Histogram, CollectorRegistry, REGISTRY, make_asgi_app, multiprocess
+from sqlalchemy import event
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_seconds",
+    "HTTP request latency",
+    ["method", "route"]
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_seconds",
+    "Database statement latency",
+    ["operation"]
+)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_seconds",
+    "Redis command latency",
+    ["command"]
+)
+
+
+def _registry():
+    """Aggregate across Gunicorn workers when running in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+metrics_app = make_asgi_app(registry=_registry())
+
+
+async def record_request_latency(request, call_next):
+    """HTTP middleware timing every request, labelled by route template"""
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    # Label by route template, not raw path, so job ids don't explode cardinality
+    route = request.scope.get("route")
+    REQUEST_LATENCY.labels(
+        request.method,
+        route.path if route else "unmatched"
+    ).observe(time.perf_counter() - start)
+
+    return response
+
+
+def instrument_engine(engine):
+    """Time every statement executed on a (sync) SQLAlchemy engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def redis_timer(command: str):
+    """Time a Redis call, including ones that fail"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REDIS_LATENCY.labels(command).observe(time.perf_counter() - start)
@@ -2,26 +2,137 @@
 FastAPI Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional, Any
+from functools import lru_cache
+from redis.exceptions import RedisError
+import asyncio
+import orjson
+import time
 import uuid
-import os
+import io
 
+from .metrics import redis_timer
 from .schemas import AnalyzeRequest, JobStatusResponse, ReportResponse, DownloadResponse
-from ..db.database import get_db
+from ..db.database import get_db, AsyncSessionLocal
 from ..db.models import AnalysisJob, Result
-from ..workers.tasks import process_analysis_job
+from ..workers.tasks import process_analysis_job, analysis_lock_key, release_analysis_lock, ANALYSIS_LOCK_TTL
 from ..core.query_cache import get_cache_stats, clear_cache
+from ..core.visibility_scorer import VisibilityScorer
+from ..core.gap_analyzer import GapAnalyzer
+from ..core.competitor_insights import CompetitorInsights
+from ..core.improvement_simulator import ImprovementSimulator
+from ..core.model_behavior import ModelBehaviorAnalyzer
+from ..core.advanced_analytics import AdvancedAnalytics
 
 router = APIRouter()
 
+# Completed jobs never change, so their computed payloads can live for a day
+REPORT_CACHE_TTL = 86400
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Status WebSockets: how long to wait for a published update before re-reading
+# the job, and the longest a single stream may stay open
+STATUS_POLL_INTERVAL = 30.0
+STATUS_STREAM_TIMEOUT = 3600
+
+# SET NX tries when the lock is released between our SET and GET
+ANALYSIS_LOCK_ATTEMPTS = 3
+
+
+@lru_cache(maxsize=1)
+def _report_generator_cls():
+    """Load ReportGenerator (pandas/openpyxl) once, on first download"""
+    from ..core.report_generator import ReportGenerator
+    return ReportGenerator
+
+
+def get_redis(request: Request):
+    """Dependency returning the shared async Redis client"""
+    return request.app.state.redis
+
+
+async def _cache_get(redis, key: str) -> Optional[bytes]:
+    """Read a cached JSON body, treating Redis failures as a cache miss"""
+    try:
+        with redis_timer("get"):
+            return await redis.get(key)
+    except RedisError:
+        return None
+
+
+async def _cache_set(redis, key: str, body: bytes):
+    """Store a JSON body, ignoring Redis failures"""
+    try:
+        with redis_timer("setex"):
+            await redis.setex(key, REPORT_CACHE_TTL, body)
+    except RedisError:
+        pass
+
+
+def _json_body(payload: Any) -> bytes:
+    """Encode a payload once so the same bytes are cached and returned"""
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+async def _job_snapshot(redis, job_id: str) -> Optional[bytes]:
+    """Read the worker-published job snapshot, treating Redis failures as a miss"""
+    try:
+        with redis_timer("hget"):
+            return await redis.hget(f"job:{job_id}", "snapshot")
+    except RedisError:
+        return None
+
+
+async def _load_scorer_results(db: AsyncSession, job_id: str) -> List[dict]:
+    """Select only the columns the scorer and analyzers read, in scorer format"""
+    stmt = select(
+        Result.query_text,
+        Result.brand_mentioned,
+        Result.brand_rank,
+        Result.competitors,
+        Result.full_response,
+        Result.model,
+        Result.intent_category,
+        Result.sentiment
+    ).where(Result.job_id == job_id)
+    
+    return [
+        {
+            'query': query,
+            'mentioned': mentioned,
+            'rank': rank,
+            'competitors': competitors or [],
+            'response': response or '',
+            'model': model,
+            'intent_category': intent_category,
+            'sentiment': sentiment
+        }
+        for query, mentioned, rank, competitors, response, model, intent_category, sentiment
+        in await db.execute(stmt)
+    ]
+
+
+async def _load_job_status(db: AsyncSession, job_id: str) -> Optional[dict]:
+    stmt = select(AnalysisJob).where(AnalysisJob.job_id == job_id)
+    job = (await db.execute(stmt)).scalar_one_or_none()
+    return job.to_dict() if job else None
+
 
 @router.post("/analyze", response_model=dict, status_code=202)
 async def create_analysis(
     request: AnalyzeRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     Start brand visibility analysis
@@ -30,6 +141,32 @@ async def create_analysis(
     # Generate unique job ID
     job_id = str(uuid.uuid4())
     
+    # Reuse a running analysis of the same brand and site instead of starting another
+    lock_key = analysis_lock_key(request.brand_name, request.website_url)
+    try:
+        for _ in range(ANALYSIS_LOCK_ATTEMPTS):
+            # Claim and read back the lock in one round trip
+            with redis_timer("lock"):
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.set(lock_key, job_id, nx=True, ex=ANALYSIS_LOCK_TTL)
+                    pipe.get(lock_key)
+                    acquired, existing_job_id = await pipe.execute()
+            
+            if acquired:
+                break
+            if existing_job_id:
+                return {
+                    "job_id": existing_job_id.decode(),
+                    "status": "pending",
+                    "message": f"Existing analysis in progress for {request.brand_name}"
+                }
+            # The holder released it between SET and GET; claim it again
+        else:
+            raise HTTPException(status_code=503, detail="Could not acquire analysis lock, please retry")
+    except RedisError:
+        # Without the lock, duplicate submissions would each start an analysis
+        raise HTTPException(status_code=503, detail="Analysis lock unavailable, please retry")
+    
     # Create job record
     job = AnalysisJob(
         job_id=job_id,
@@ -38,17 +175,21 @@ async def create_analysis(
         status='pending',
         progress=0
     )
-    db.add(job)
-    db.commit()
-    
-    # Queue background task
-    background_tasks.add_task(
-        process_analysis_job,
-        job_id=job_id,
-        brand_name=request.brand_name,
-        website_url=request.website_url,
-        query_count=request.query_count
-    )
+    try:
+        db.add(job)
+        await db.commit()
+        
+        # Queue job on the Celery worker pool
+        process_analysis_job.delay(
+            job_id=job_id,
+            brand_name=request.brand_name,
+            website_url=request.website_url,
+            query_count=request.query_count
+        )
+    except Exception:
+        # Otherwise resubmissions would be pointed at a job that never runs
+        await release_analysis_lock(redis, job_id, request.brand_name, request.website_url)
+        raise
     
     return {
         "job_id": job_id,
@@ -58,24 +199,117 @@ async def create_analysis(
 
 
 @router.get("/status/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(job_id: str, db: Session = Depends(get_db)):
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_db), redis=Depends(get_redis)):
     """
     Get analysis job status
+    Served from the Redis progress snapshot, falling back to the database
     """
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    snapshot = await _job_snapshot(redis, job_id)
+    if snapshot:
+        return _json_response(snapshot)
     
-    if not job:
+    status = await _load_job_status(db, job_id)
+    if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return job.to_dict()
+    return status
+
+
+async def _current_job_status(redis, job_id: str) -> Optional[dict]:
+    """Latest job status: the worker's Redis snapshot, else the database row"""
+    snapshot = await _job_snapshot(redis, job_id)
+    if snapshot:
+        return orjson.loads(snapshot)
+    async with AsyncSessionLocal() as db:
+        return await _load_job_status(db, job_id)
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Return once the client closes the socket (any messages it sends are ignored)"""
+    try:
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+
+@router.websocket("/ws/status/{job_id}")
+async def job_status_ws(websocket: WebSocket, job_id: str):
+    """
+    Push job progress to the client as the worker publishes it
+    """
+    await websocket.accept()
+    redis = websocket.app.state.redis
+    pubsub = redis.pubsub()
+    # Nothing else reads the socket, so this is how a client disconnect is noticed
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    deadline = time.monotonic() + STATUS_STREAM_TIMEOUT
+    
+    try:
+        # Subscribe before reading the snapshot so no update falls in between
+        await pubsub.subscribe(f"job:{job_id}")
+        
+        status = await _current_job_status(redis, job_id)
+        if not status:
+            await websocket.close(code=4404, reason="Job not found")
+            return
+        
+        await websocket.send_json(status)
+        
+        while status['status'] not in TERMINAL_STATUSES:
+            next_message = asyncio.create_task(
+                pubsub.get_message(ignore_subscribe_messages=True, timeout=STATUS_POLL_INTERVAL)
+            )
+            await asyncio.wait(
+                {next_message, disconnected},
+                timeout=deadline - time.monotonic(),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected.done():
+                next_message.cancel()
+                return
+            if not next_message.done():
+                next_message.cancel()
+                await websocket.close(code=1001, reason="Status stream deadline reached")
+                return
+            
+            message = next_message.result()
+            if message is not None:
+                status = orjson.loads(message['data'])
+                await websocket.send_json(status)
+                continue
+            
+            # Nothing published for a while: the job may be gone or its worker dead
+            latest = await _current_job_status(redis, job_id)
+            if not latest:
+                await websocket.close(code=4404, reason="Job not found")
+                return
+            if latest != status:
+                status = latest
+                await websocket.send_json(status)
+        
+        await websocket.close()
+    
+    except (WebSocketDisconnect, RedisError):
+        pass
+    
+    finally:
+        disconnected.cancel()
+        await pubsub.close()
 
 
 @router.get("/report/{job_id}")
-async def get_report(job_id: str, db: Session = Depends(get_db)):
+async def get_report(job_id: str, db: AsyncSession = Depends(get_db), redis=Depends(get_redis)):
     """
     Get full analysis report
     """
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    cache_key = f"report:{job_id}"
+    cached = await _cache_get(redis, cache_key)
+    if cached:
+        return _json_response(cached)
+    
+    stmt = select(AnalysisJob).options(joinedload(AnalysisJob.results)).where(AnalysisJob.job_id == job_id)
+    job = (await db.execute(stmt)).unique().scalar_one_or_none()
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -87,37 +321,35 @@ async def get_report(job_id: str, db: Session = Depends(get_db)):
         )
     
     # Get all results
-    results = db.query(Result).filter(Result.job_id == job_id).all()
+    results = job.results
     
     if not results:
         raise HTTPException(status_code=404, detail="No results found")
     
-    # Convert to dict
-    results_data = [r.to_dict() for r in results]
-    
-    # Calculate additional metrics
-    from ..core.visibility_scorer import VisibilityScorer
-    scorer = VisibilityScorer(job.brand_name)
-    
-    # Prepare results in scorer format
+    # Build the response rows and the scorer input in one pass
+    results_data = []
     scorer_results = []
-    for r in results_data:
+    for r in results:
+        results_data.append(r.to_dict())
         scorer_results.append({
-            'mentioned': r['brand_mentioned'],
-            'rank': r['brand_rank'],
-            'competitors': r['competitors'] or [],
-            'response': r['full_response'] or '',
-            'model': r['model'],
-            'intent_category': r['intent_category']
+            'mentioned': r.brand_mentioned,
+            'rank': r.brand_rank,
+            'competitors': r.competitors or [],
+            'response': r.full_response or '',
+            'model': r.model,
+            'intent_category': r.intent_category
         })
     
+    # Calculate additional metrics
+    scorer = VisibilityScorer(job.brand_name)
+    
     # Calculate scores
     visibility_scores = scorer.calculate_visibility_score(scorer_results)
     category_breakdown = scorer.category_breakdown(scorer_results)
     model_breakdown = scorer.model_breakdown(scorer_results)
     top_competitors = scorer.get_top_competitors(scorer_results, 10)
     
-    return {
+    payload = {
         "job_id": job_id,
         "brand_name": job.brand_name,
         "industry": job.industry,
@@ -128,25 +360,27 @@ async def get_report(job_id: str, db: Session = Depends(get_db)):
         "model_breakdown": model_breakdown,
         "category_breakdown": category_breakdown
     }
+    
+    body = _json_body(payload)
+    await _cache_set(redis, cache_key, body)
+    return _json_response(body)
 
 
 @router.get("/download/{job_id}/{format}")
 async def download_report(
     job_id: str,
     format: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Download report as Excel or CSV
     format: 'excel' or 'csv'
     """
-    from fastapi.responses import FileResponse
-    import os
-    
     if format not in ['excel', 'csv']:
         raise HTTPException(status_code=400, detail="Format must be 'excel' or 'csv'")
     
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    stmt = select(AnalysisJob).options(joinedload(AnalysisJob.results)).where(AnalysisJob.job_id == job_id)
+    job = (await db.execute(stmt)).unique().scalar_one_or_none()
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -155,13 +389,10 @@ async def download_report(
         raise HTTPException(status_code=400, detail="Job not completed yet")
     
     # Get results
-    results = db.query(Result).filter(Result.job_id == job_id).all()
+    results = job.results
     results_data = [r.to_dict() for r in results]
     
     # Generate report
-    from ..core.report_generator import ReportGenerator
-    from ..core.visibility_scorer import VisibilityScorer
-    
     scorer = VisibilityScorer(job.brand_name)
     scorer_results = []
     for r in results_data:
@@ -185,63 +416,82 @@ async def download_report(
     
     visibility_scores = scorer.calculate_visibility_score(scorer_results)
     
-    generator = ReportGenerator(job.brand_name, job.industry or "Unknown")
+    generator = _report_generator_cls()(job.brand_name, job.industry or "Unknown")
     df, summary_df, category_df, model_df = generator.generate_report(
         scorer_results,
         visibility_scores
     )
     
-    # Save file
-    output_dir = 'reports'
-    os.makedirs(output_dir, exist_ok=True)
-    
+    # Build the file in memory so any API worker can serve it
+    buf = io.BytesIO()
     if format == 'excel':
-        filepath = generator.save_excel(df, summary_df, category_df, model_df, output_dir)
+        generator.write_excel(df, summary_df, category_df, model_df, buf)
+        filename = generator.report_filename('xlsx')
+        media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     else:
-        filepath = generator.save_csv(df, output_dir)
-    
-    return FileResponse(
-        path=filepath,
-        filename=os.path.basename(filepath),
-        media_type='application/octet-stream'
+        generator.write_csv(df, buf)
+        filename = generator.report_filename('csv')
+        media_type = 'text/csv'
+    buf.seek(0)
+    
+    return StreamingResponse(
+        buf,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
 @router.get("/jobs")
-async def list_jobs(limit: int = 20, db: Session = Depends(get_db)):
+async def list_jobs(
+    limit: int = 20,
+    offset: int = 0,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
     List recent analysis jobs
+    Returns only the columns a job list needs, newest first
     """
-    jobs = db.query(AnalysisJob)\
-        .order_by(AnalysisJob.created_at.desc())\
-        .limit(limit)\
-        .all()
+    stmt = select(
+        AnalysisJob.job_id,
+        AnalysisJob.brand_name,
+        AnalysisJob.status,
+        AnalysisJob.progress,
+        AnalysisJob.overall_score,
+        AnalysisJob.created_at
+    )
+    if status:
+        stmt = stmt.where(AnalysisJob.status == status)
+    stmt = stmt.order_by(AnalysisJob.created_at.desc()).offset(offset).limit(limit)
     
-    return [job.to_dict() for job in jobs]
+    return [dict(row._mapping) for row in await db.execute(stmt)]
 
 
 @router.delete("/job/{job_id}")
-async def delete_job(job_id: str, db: Session = Depends(get_db)):
+async def delete_job(job_id: str, db: AsyncSession = Depends(get_db), redis=Depends(get_redis)):
     """
     Delete analysis job and its results
     """
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    # Results are removed by ON DELETE CASCADE
+    deleted = await db.execute(delete(AnalysisJob).where(AnalysisJob.job_id == job_id))
     
-    if not job:
+    if deleted.rowcount == 0:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Delete results
-    db.query(Result).filter(Result.job_id == job_id).delete()
+    await db.commit()
     
-    # Delete job
-    db.delete(job)
-    db.commit()
+    # Invalidate cached report payloads
+    try:
+        with redis_timer("delete"):
+            await redis.delete(f"report:{job_id}", f"adv:{job_id}", f"job:{job_id}")
+    except RedisError:
+        pass
     
     return {"message": f"Job {job_id} deleted successfully"}
 
 
 @router.get("/advanced-analytics/{job_id}")
-async def get_advanced_analytics(job_id: str, db: Session = Depends(get_db)):
+async def get_advanced_analytics(job_id: str, db: AsyncSession = Depends(get_db), redis=Depends(get_redis)):
     """
     Get ALL 10 differentiating features for a completed job
     Features:
@@ -256,7 +506,13 @@ async def get_advanced_analytics(job_id: str, db: Session = Depends(get_db)):
     9. Competitor Dominance Clustering
     10. Visibility Timeline Projection
     """
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    cache_key = f"adv:{job_id}"
+    cached = await _cache_get(redis, cache_key)
+    if cached:
+        return _json_response(cached)
+    
+    stmt = select(AnalysisJob).where(AnalysisJob.job_id == job_id)
+    job = (await db.execute(stmt)).scalar_one_or_none()
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -265,48 +521,27 @@ async def get_advanced_analytics(job_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Analysis not complete yet")
     
     # Get results
-    results = db.query(Result).filter(Result.job_id == job_id).all()
-    results_data = [r.to_dict() for r in results]
-    
-    # Import all feature modules
-    from ..core.gap_analyzer import GapAnalyzer
-    from ..core.competitor_insights import CompetitorInsights
-    from ..core.improvement_simulator import ImprovementSimulator
-    from ..core.model_behavior import ModelBehaviorAnalyzer
-    from ..core.advanced_analytics import AdvancedAnalytics
-    from ..core.visibility_scorer import VisibilityScorer
+    scorer_results = await _load_scorer_results(db, job_id)
     
     # Get current score
     scorer = VisibilityScorer(job.brand_name)
-    scorer_results = []
-    for r in results_data:
-        scorer_results.append({
-            'mentioned': r['brand_mentioned'],
-            'rank': r['brand_rank'],
-            'competitors': r['competitors'] or [],
-            'response': r['full_response'] or '',
-            'model': r['model'],
-            'intent_category': r['intent_category'],
-            'sentiment': r.get('sentiment', 'N/A')
-        })
-    
     visibility_scores = scorer.calculate_visibility_score(scorer_results)
     current_score = visibility_scores['overall_score']
     
     # Feature #1: Gap Analysis (Why Not Mentioned)
     gap_analyzer = GapAnalyzer(job.brand_name)
-    gap_analysis = gap_analyzer.analyze_non_mentions(scorer_results)
+    gap_analysis = await gap_analyzer.analyze_non_mentions(scorer_results)
     
     # Feature #2: Competitor Insights
     comp_insights = CompetitorInsights(job.brand_name, job.industry or "Unknown")
-    competitor_analysis = comp_insights.analyze_competitors(scorer_results)
+    competitor_analysis = await comp_insights.analyze_competitors(scorer_results)
     
     # Feature #4: Sentiment already in results (added to mention_detector)
     sentiment_summary = {
-        'positive': len([r for r in results_data if r.get('sentiment') == 'Positive']),
-        'neutral': len([r for r in results_data if r.get('sentiment') == 'Neutral']),
-        'negative': len([r for r in results_data if r.get('sentiment') == 'Negative']),
-        'hesitant': len([r for r in results_data if r.get('sentiment') == 'Hesitant'])
+        'positive': len([r for r in scorer_results if r['sentiment'] == 'Positive']),
+        'neutral': len([r for r in scorer_results if r['sentiment'] == 'Neutral']),
+        'negative': len([r for r in scorer_results if r['sentiment'] == 'Negative']),
+        'hesitant': len([r for r in scorer_results if r['sentiment'] == 'Hesitant'])
     }
     
     # Feature #5: Model Behavior
@@ -321,7 +556,7 @@ async def get_advanced_analytics(job_id: str, db: Session = Depends(get_db)):
         competitor_analysis
     )
     
-    return {
+    payload = {
         'job_id': job_id,
         'brand_name': job.brand_name,
         'current_score': current_score,
@@ -349,13 +584,17 @@ async def get_advanced_analytics(job_id: str, db: Session = Depends(get_db)):
             ]
         }
     }
+    
+    body = _json_body(payload)
+    await _cache_set(redis, cache_key, body)
+    return _json_response(body)
 
 
 @router.post("/simulate-improvement/{job_id}")
 async def simulate_improvement(
     job_id: str,
     improvements: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Feature #3: Run improvement simulation with user inputs
@@ -369,7 +608,8 @@ async def simulate_improvement(
         "pricing_strategy": "Introduce $6.99/serving starter plan"
     }
     """
-    job = db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).first()
+    stmt = select(AnalysisJob).where(AnalysisJob.job_id == job_id)
+    job = (await db.execute(stmt)).scalar_one_or_none()
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -378,31 +618,16 @@ async def simulate_improvement(
         raise HTTPException(status_code=400, detail="Analysis not complete")
     
     # Get results
-    results = db.query(Result).filter(Result.job_id == job_id).all()
-    results_data = [r.to_dict() for r in results]
+    scorer_results = await _load_scorer_results(db, job_id)
     
     # Get current score
-    from ..core.visibility_scorer import VisibilityScorer
-    from ..core.improvement_simulator import ImprovementSimulator
-    
     scorer = VisibilityScorer(job.brand_name)
-    scorer_results = []
-    for r in results_data:
-        scorer_results.append({
-            'mentioned': r['brand_mentioned'],
-            'rank': r['brand_rank'],
-            'competitors': r['competitors'] or [],
-            'response': r['full_response'] or '',
-            'model': r['model'],
-            'intent_category': r['intent_category']
-        })
-    
     visibility_scores = scorer.calculate_visibility_score(scorer_results)
     current_score = visibility_scores['overall_score']
     
     # Run simulation
     simulator = ImprovementSimulator(job.brand_name, job.industry or "Unknown", current_score)
-    simulation_result = simulator.simulate_improvement(scorer_results, improvements)
+    simulation_result = await simulator.simulate_improvement(scorer_results, improvements)
     
     return {
         'job_id': job_id,
@@ -7,9 +7,107 @@ Features #6-10: Additional Analysis Modules
 - Visibility Timeline Simulator
 """
 
-from typing import List, Dict, Any
-from collections import Counter, defaultdict
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import operator
+import os
 import re
+import numpy as np
+
+from .keyword_matcher import KeywordMatcher, query_lower
+
+# Try to import numba, but make it optional
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Timeline parsing: first number in an impact string, and effort weights
+_IMPACT_NUM_RE = re.compile(r'(\d+)')
+_EFFORT_POINTS = {'Low': 1, 'Medium': 2, 'High': 3}
+
+# Below this many results, thread hand-off costs more than the analyzers themselves
+PARALLEL_MIN_RESULTS = int(os.getenv('ANALYTICS_PARALLEL_MIN_RESULTS', '200'))
+
+# Sort key for (name, count) pairs
+_BY_COUNT = operator.itemgetter(1)
+
+# Opportunity priorities, highest first
+_PRIORITY_ORDER = ('High', 'Medium', 'Low')
+
+
+class Relevance(NamedTuple):
+    """Why a brand should appear in a query; reason is formatted per opportunity"""
+    priority: str
+    reason: str
+
+
+@dataclass(slots=True, frozen=True)
+class ScoredQuery:
+    """Difficulty of one query; serialized as an object by orjson"""
+    query: str
+    difficulty: str
+    score: int
+    reasoning: str
+    mentioned: bool
+    competitor_count: int
+
+
+@dataclass(slots=True, frozen=True)
+class OpportunityRecord:
+    """A query where the brand should appear but doesn't"""
+    query: str
+    reason: str
+    competitors_present: List[str]
+    priority: str
+    model: str
+
+
+_REL_HIGH_MULTI_COMP = Relevance('High', "Multiple similar competitors ({competitors}) appear, but {brand} doesn't")
+_REL_MED_INDUSTRY = Relevance('Medium', "Industry-relevant query with competitors present")
+_REL_MED_FEATURE = Relevance('Medium', "Query emphasizes features brand likely offers")
+
+# Query difficulty tiers: points and reasoning per factor, indexed by tier
+DIFFICULTY_LEVELS = ('Easy', 'Medium', 'Hard')
+_COMPETITOR_POINTS = (10, 25, 40)
+_COMPETITOR_REASONS = ('Only {} competitors', '{} competitors', '{} competitors')
+_BRAND_POINTS = (30, 20, 5)
+_BRAND_REASONS = ('Brand absent', 'Low rank (#{})', 'Good rank (#{})')
+_QUERY_POINTS = (30, 10, 20)
+_QUERY_REASONS = ('High-competition keywords', 'Niche/specific query', 'General query')
+
+
+def _accumulate_cluster_counts(cluster_masks, comp_ids, comp_offsets, counts, first_seen, cluster_first):
+    """
+    Count competitor mentions per cluster over integer-encoded results
+    
+    cluster_masks[q] has bit c set when query q belongs to cluster c; the
+    competitors of query q are comp_ids[comp_offsets[q]:comp_offsets[q + 1]].
+    first_seen / cluster_first record insertion order so callers can keep
+    the ordering of the original dict-based aggregation.
+    """
+    seq = 0
+    for q in range(cluster_masks.shape[0]):
+        mask = cluster_masks[q]
+        for c in range(counts.shape[0]):
+            if mask & (1 << c):
+                for k in range(comp_offsets[q], comp_offsets[q + 1]):
+                    comp = comp_ids[k]
+                    if counts[c, comp] == 0:
+                        first_seen[c, comp] = seq
+                        if cluster_first[c] < 0:
+                            cluster_first[c] = seq
+                    counts[c, comp] += 1
+                    seq += 1
+
+
+if NUMBA_AVAILABLE:
+    # nogil lets the kernel overlap with the other analyzers in run_full_analysis
+    _accumulate_cluster_counts = njit(cache=True, nogil=True)(_accumulate_cluster_counts)
 
 
 class QueryDifficultyAnalyzer:
@@ -18,90 +116,93 @@ class QueryDifficultyAnalyzer:
     def __init__(self, brand_name: str):
         self.brand_name = brand_name
     
-    def analyze_difficulty(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_difficulty(
+        self,
+        results: List[Dict[str, Any]],
+        features: Optional[List['QueryFeatures']] = None
+    ) -> Dict[str, Any]:
         """Assign difficulty score to each query"""
-        scored_queries = []
+        if features is None:
+            features = extract_query_features(results)
         
-        for result in results:
-            difficulty = self._calculate_difficulty(result)
-            scored_queries.append({
-                'query': result.get('query', ''),
-                'difficulty': difficulty['level'],
-                'score': difficulty['score'],
-                'reasoning': difficulty['reasoning'],
-                'mentioned': result.get('mentioned', False),
-                'competitor_count': len(result.get('competitors', []))
-            })
-        
-        # Aggregate stats
-        difficulty_distribution = Counter(q['difficulty'] for q in scored_queries)
-        
-        # Find opportunities (easy queries where brand isn't mentioned)
-        easy_opportunities = [q for q in scored_queries if q['difficulty'] == 'Easy' and not q['mentioned']]
+        scored_queries = []
+        difficulty_distribution = {}
+        easy_opportunities = []
+        easy_total = 0
+        non_mention_count = 0
+        score_sum = 0
+        
+        # Score and aggregate in a single pass
+        for result, feat in zip(results, features):
+            competitor_count = feat.n_competitors
+            score, level, factors = self._score_difficulty(result, feat)
+            entry = ScoredQuery(
+                query=result.get('query', ''),
+                difficulty=DIFFICULTY_LEVELS[level],
+                score=score,
+                reasoning=self._difficulty_reasoning(factors, competitor_count, result.get('rank', 999)),
+                mentioned=result.get('mentioned', False),
+                competitor_count=competitor_count
+            )
+            scored_queries.append(entry)
+            
+            difficulty_distribution[entry.difficulty] = difficulty_distribution.get(entry.difficulty, 0) + 1
+            score_sum += score
+            if not entry.mentioned:
+                non_mention_count += 1
+            
+            # Opportunities: easy queries where brand isn't mentioned (keep top 10)
+            if level == 0 and not entry.mentioned:
+                easy_total += 1
+                if len(easy_opportunities) < 10:
+                    easy_opportunities.append(entry)
         
         return {
             'scored_queries': scored_queries,
-            'difficulty_distribution': dict(difficulty_distribution),
-            'easy_opportunities_count': len(easy_opportunities),
-            'easy_opportunities': easy_opportunities[:10],  # Top 10
-            'average_difficulty_score': round(sum(q['score'] for q in scored_queries) / len(scored_queries), 1) if scored_queries else 0
+            'difficulty_distribution': difficulty_distribution,
+            'easy_opportunities_count': easy_total,
+            'easy_opportunities': easy_opportunities,
+            'non_mention_count': non_mention_count,
+            'average_difficulty_score': round(score_sum / len(scored_queries), 1) if scored_queries else 0
         }
     
-    def _calculate_difficulty(self, result: Dict) -> Dict[str, Any]:
-        """Calculate difficulty for single query"""
-        score = 0
-        factors = []
-        
+    def _score_difficulty(self, result: Dict, feat: 'QueryFeatures') -> Tuple[int, int, int]:
+        """
+        Score a single query without building any strings
+
+        Returns (score, level index into DIFFICULTY_LEVELS, packed factor tiers);
+        pass the factors to _difficulty_reasoning for the human-readable text.
+        """
         # Factor 1: Competitor count (0-40 points)
-        competitor_count = len(result.get('competitors', []))
-        if competitor_count > 8:
-            score += 40
-            factors.append(f"{competitor_count} competitors")
-        elif competitor_count > 4:
-            score += 25
-            factors.append(f"{competitor_count} competitors")
-        else:
-            score += 10
-            factors.append(f"Only {competitor_count} competitors")
+        competitor_tier = (feat.n_competitors > 4) + (feat.n_competitors > 8)
         
         # Factor 2: Brand mentioned (0-30 points)
         if not result.get('mentioned', False):
-            score += 30
-            factors.append("Brand absent")
+            brand_tier = 0
         else:
-            rank = result.get('rank', 999)
-            if rank > 5:
-                score += 20
-                factors.append(f"Low rank (#{rank})")
-            else:
-                score += 5
-                factors.append(f"Good rank (#{rank})")
+            brand_tier = 2 - (result.get('rank', 999) > 5)
         
         # Factor 3: Query specificity (0-30 points)
-        query = result.get('query', '').lower()
-        if any(kw in query for kw in ['best', 'top', 'vs', 'comparison', 'review']):
-            score += 30
-            factors.append("High-competition keywords")
-        elif len(query.split()) > 8:
-            score += 10
-            factors.append("Niche/specific query")
-        else:
-            score += 20
-            factors.append("General query")
-        
-        # Determine level
-        if score >= 70:
-            level = "Hard"
-        elif score >= 40:
-            level = "Medium"
+        if feat.has_highcomp_kw:
+            query_tier = 0
         else:
-            level = "Easy"
+            query_tier = 2 - (feat.word_count > 8)
         
-        return {
-            'score': score,
-            'level': level,
-            'reasoning': ', '.join(factors)
-        }
+        score = (_COMPETITOR_POINTS[competitor_tier]
+                 + _BRAND_POINTS[brand_tier]
+                 + _QUERY_POINTS[query_tier])
+        level = (score >= 40) + (score >= 70)
+        
+        return score, level, competitor_tier | brand_tier << 2 | query_tier << 4
+    
+    @staticmethod
+    def _difficulty_reasoning(factors: int, competitor_count: int, rank: Any) -> str:
+        """Render packed factor tiers as the reasoning text"""
+        return ', '.join((
+            _COMPETITOR_REASONS[factors & 3].format(competitor_count),
+            _BRAND_REASONS[factors >> 2 & 3].format(rank),
+            _QUERY_REASONS[factors >> 4 & 3]
+        ))
 
 
 class RecommendationEngine:
@@ -124,7 +225,7 @@ class RecommendationEngine:
         # Rec 1: Target easy wins
         easy_opps = difficulty_analysis.get('easy_opportunities', [])
         if easy_opps:
-            queries = ', '.join([q['query'][:40] for q in easy_opps[:3]])
+            queries = ', '.join([q.query[:40] for q in easy_opps[:3]])
             recommendations.append({
                 'priority': 'High',
                 'category': 'Quick Wins',
@@ -164,7 +265,10 @@ class RecommendationEngine:
                 })
         
         # Rec 4: Model-specific optimization
-        non_mention_rate = len([r for r in results if not r.get('mentioned')]) / len(results) * 100 if results else 0
+        non_mention_count = difficulty_analysis.get('non_mention_count')
+        if non_mention_count is None:
+            non_mention_count = sum(1 for r in results if not r.get('mentioned'))
+        non_mention_rate = non_mention_count / len(results) * 100 if results else 0
         if non_mention_rate > 50:
             recommendations.append({
                 'priority': 'High',
@@ -196,112 +300,110 @@ class OpportunityDetector:
     def __init__(self, brand_name: str):
         self.brand_name = brand_name
     
-    def detect_opportunities(self, results: List[Dict[str, Any]], brand_info: Dict = None) -> Dict[str, Any]:
+    def detect_opportunities(
+        self,
+        results: List[Dict[str, Any]],
+        features: Optional[List['QueryFeatures']] = None
+    ) -> Dict[str, Any]:
         """Detect queries where brand SHOULD appear but doesn't"""
-        opportunities = []
+        if features is None:
+            features = extract_query_features(results)
+        
+        # Bucket by priority while scanning; concatenating the buckets gives
+        # the same stable High > Medium > Low ordering as sorting would
+        buckets = {priority: [] for priority in _PRIORITY_ORDER}
         
-        for result in results:
+        for result, feat in zip(results, features):
             if result.get('mentioned'):
                 continue  # Already mentioned
             
             # Check if brand is relevant
-            relevance = self._check_relevance(result, brand_info)
-            
-            if relevance['should_appear']:
-                opportunities.append({
-                    'query': result.get('query', ''),
-                    'reason': relevance['reason'],
-                    'competitors_present': result.get('competitors', [])[:5],
-                    'priority': relevance['priority'],
-                    'model': result.get('model', '')
-                })
-        
-        # Sort by priority
-        opportunities.sort(key=lambda x: {'High': 3, 'Medium': 2, 'Low': 1}.get(x['priority'], 0), reverse=True)
+            relevance = self._check_relevance(feat)
+            if relevance is not None:
+                buckets[relevance.priority].append((result, relevance))
+        
+        matched = [item for priority in _PRIORITY_ORDER for item in buckets[priority]]
+        high_priority = len(buckets['High'])
+        
+        # Only the opportunities actually returned are materialized
+        opportunities = [
+            OpportunityRecord(
+                query=result.get('query', ''),
+                reason=relevance.reason.format(
+                    competitors=', '.join(result.get('competitors', [])[:2]),
+                    brand=self.brand_name
+                ),
+                competitors_present=result.get('competitors', [])[:5],
+                priority=relevance.priority,
+                model=result.get('model', '')
+            )
+            for result, relevance in matched[:20]  # Top 20
+        ]
         
         return {
-            'total_opportunities': len(opportunities),
-            'high_priority': len([o for o in opportunities if o['priority'] == 'High']),
-            'opportunities': opportunities[:20],  # Top 20
-            'summary': self._generate_summary(opportunities)
+            'total_opportunities': len(matched),
+            'high_priority': high_priority,
+            'opportunities': opportunities,
+            'summary': self._generate_summary(len(matched), high_priority)
         }
     
-    def _check_relevance(self, result: Dict, brand_info: Dict) -> Dict[str, Any]:
-        """Check if brand should appear in this query"""
-        query = result.get('query', '').lower()
-        competitors = result.get('competitors', [])
-        
+    def _check_relevance(self, feat: 'QueryFeatures') -> Optional[Relevance]:
+        """Check if brand should appear in this query; None if it shouldn't"""
         # Same-segment competitors present
-        if len(competitors) >= 2:
-            return {
-                'should_appear': True,
-                'reason': f"Multiple similar competitors ({', '.join(competitors[:2])}) appear, but {self.brand_name} doesn't",
-                'priority': 'High'
-            }
+        if feat.n_competitors >= 2:
+            return _REL_HIGH_MULTI_COMP
         
         # Industry keywords in query
-        industry_keywords = ['meal kit', 'delivery', 'subscription', 'service', 'platform', 'app']
-        if any(kw in query for kw in industry_keywords) and competitors:
-            return {
-                'should_appear': True,
-                'reason': f"Industry-relevant query with competitors present",
-                'priority': 'Medium'
-            }
+        if feat.has_industry_kw and feat.n_competitors:
+            return _REL_MED_INDUSTRY
         
         # Specific features mentioned
-        if any(kw in query for kw in ['affordable', 'organic', 'fast', 'easy', 'best']):
-            return {
-                'should_appear': True,
-                'reason': f"Query emphasizes features brand likely offers",
-                'priority': 'Medium'
-            }
+        if feat.has_feature_kw:
+            return _REL_MED_FEATURE
         
-        return {
-            'should_appear': False,
-            'reason': '',
-            'priority': 'Low'
-        }
+        return None
     
-    def _generate_summary(self, opportunities: List[Dict]) -> str:
+    def _generate_summary(self, total: int, high_pri: int) -> str:
         """Generate executive summary"""
-        if not opportunities:
+        if not total:
             return "No significant missed opportunities detected."
         
-        high_pri = len([o for o in opportunities if o['priority'] == 'High'])
-        
-        return f"Found {len(opportunities)} missed opportunities where {self.brand_name} should appear but doesn't. {high_pri} are high-priority (direct competitors present). Prioritize these for immediate content creation."
+        return f"Found {total} missed opportunities where {self.brand_name} should appear but doesn't. {high_pri} are high-priority (direct competitors present). Prioritize these for immediate content creation."
 
 
 class CompetitorClustering:
     """Feature #9: Cluster competitor dominance by theme"""
     
+    CLUSTERS = {
+        'Price-Sensitive': ('cheap', 'affordable', 'budget', 'cost', 'inexpensive', 'discount'),
+        'Health-Conscious': ('healthy', 'nutrition', 'organic', 'diet', 'wellness', 'fitness'),
+        'Fast-Delivery': ('fast', 'quick', 'express', 'same-day', 'speed', 'delivery'),
+        'Family-Sized': ('family', 'large', 'kids', 'children', 'portions', 'bulk'),
+        'Eco-Friendly': ('eco', 'sustainable', 'green', 'organic', 'environment', 'carbon')
+    }
+    
     def __init__(self):
-        self.clusters = {
-            'Price-Sensitive': ['cheap', 'affordable', 'budget', 'cost', 'inexpensive', 'discount'],
-            'Health-Conscious': ['healthy', 'nutrition', 'organic', 'diet', 'wellness', 'fitness'],
-            'Fast-Delivery': ['fast', 'quick', 'express', 'same-day', 'speed', 'delivery'],
-            'Family-Sized': ['family', 'large', 'kids', 'children', 'portions', 'bulk'],
-            'Eco-Friendly': ['eco', 'sustainable', 'green', 'organic', 'environment', 'carbon']
-        }
+        self.clusters = self.CLUSTERS
     
-    def cluster_competitors(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def cluster_competitors(
+        self,
+        results: List[Dict[str, Any]],
+        features: Optional[List['QueryFeatures']] = None
+    ) -> Dict[str, Any]:
         """Group competitor mentions by intent clusters"""
-        cluster_data = defaultdict(lambda: defaultdict(int))
+        if features is None:
+            features = extract_query_features(results)
         
-        for result in results:
-            query = result.get('query', '').lower()
-            competitors = result.get('competitors', [])
-            
-            # Identify cluster
-            for cluster_name, keywords in self.clusters.items():
-                if any(kw in query for kw in keywords):
-                    for comp in competitors:
-                        cluster_data[cluster_name][comp] += 1
+        if NUMBA_AVAILABLE:
+            cluster_data = self._count_with_kernel(results, features)
+        else:
+            cluster_data = self._count_with_counters(results, features)
         
         # Format results
         formatted_clusters = {}
         for cluster, competitors in cluster_data.items():
-            sorted_comps = sorted(competitors.items(), key=lambda x: x[1], reverse=True)
+            # Only the top 5 are ever used
+            sorted_comps = heapq.nlargest(5, competitors.items(), key=_BY_COUNT)
             dominant_competitor = sorted_comps[0][0] if sorted_comps else 'None'
             
             formatted_clusters[cluster] = {
@@ -319,6 +421,69 @@ class CompetitorClustering:
             'insights': insights
         }
     
+    def _count_with_counters(
+        self,
+        results: List[Dict[str, Any]],
+        features: List['QueryFeatures']
+    ) -> Dict[str, Counter]:
+        """Count competitors per cluster with Counter.update (no numba)"""
+        cluster_data: Dict[str, Counter] = {}
+        
+        for result, feat in zip(results, features):
+            competitors = result.get('competitors', [])
+            if not competitors:
+                continue
+            
+            for c, cluster_name in enumerate(self.clusters):
+                if feat.cluster_mask & (1 << c):
+                    # Created on first mention to keep the first-seen cluster order
+                    counter = cluster_data.get(cluster_name)
+                    if counter is None:
+                        counter = cluster_data[cluster_name] = Counter()
+                    counter.update(competitors)
+        
+        return cluster_data
+    
+    def _count_with_kernel(
+        self,
+        results: List[Dict[str, Any]],
+        features: List['QueryFeatures']
+    ) -> Dict[str, Dict[str, int]]:
+        """Count competitors per cluster with the compiled kernel over encoded arrays"""
+        cluster_names = list(self.clusters)
+        
+        # Encode results as cluster bitmasks plus a flat array of competitor ids
+        comp_index: Dict[str, int] = {}
+        cluster_masks = np.fromiter((feat.cluster_mask for feat in features), dtype=np.int64, count=len(features))
+        comp_offsets = np.zeros(len(results) + 1, dtype=np.int64)
+        flat_ids = []
+        
+        for q, result in enumerate(results):
+            for comp in result.get('competitors', []):
+                flat_ids.append(comp_index.setdefault(comp, len(comp_index)))
+            comp_offsets[q + 1] = len(flat_ids)
+        
+        counts = np.zeros((len(cluster_names), len(comp_index)), dtype=np.int32)
+        first_seen = np.zeros_like(counts, dtype=np.int64)
+        cluster_first = np.full(len(cluster_names), -1, dtype=np.int64)
+        _accumulate_cluster_counts(
+            cluster_masks,
+            np.asarray(flat_ids, dtype=np.int64),
+            comp_offsets,
+            counts,
+            first_seen,
+            cluster_first
+        )
+        
+        # Decode back to {cluster: {competitor: count}} in first-seen order
+        comp_names = list(comp_index)
+        cluster_data = {}
+        for c in sorted(np.flatnonzero(cluster_first >= 0), key=lambda c: cluster_first[c]):
+            present = sorted(np.flatnonzero(counts[c]), key=lambda comp: first_seen[c, comp])
+            cluster_data[cluster_names[c]] = {comp_names[comp]: int(counts[c, comp]) for comp in present}
+        
+        return cluster_data
+    
     def _generate_cluster_insights(self, clusters: Dict) -> List[str]:
         """Generate insights from cluster data"""
         insights = []
@@ -333,6 +498,55 @@ class CompetitorClustering:
         return insights
 
 
+@dataclass(slots=True)
+class QueryFeatures:
+    """Everything the analyzers read from one result's query, extracted once"""
+    query_lower: str
+    word_count: int
+    has_highcomp_kw: bool
+    has_industry_kw: bool
+    has_feature_kw: bool
+    cluster_mask: int  # bit c set for the c-th entry of CompetitorClustering.CLUSTERS
+    n_competitors: int
+
+
+# Difficulty, relevance and cluster keywords share one matcher so each query
+# is scanned a single time
+_query_feature_matcher = KeywordMatcher({
+    'competitive': ('best', 'top', 'vs', 'comparison', 'review'),
+    'industry': ('meal kit', 'delivery', 'subscription', 'service', 'platform', 'app'),
+    'feature': ('affordable', 'organic', 'fast', 'easy', 'best'),
+    **CompetitorClustering.CLUSTERS
+})
+_CLUSTER_BITS = tuple((name, 1 << c) for c, name in enumerate(CompetitorClustering.CLUSTERS))
+
+
+def extract_query_features(results: List[Dict[str, Any]]) -> List[QueryFeatures]:
+    """Scan every query once and return its features, aligned with results"""
+    features = []
+    
+    for result in results:
+        query = query_lower(result)
+        hits = _query_feature_matcher.match(query)
+        
+        cluster_mask = 0
+        for name, bit in _CLUSTER_BITS:
+            if name in hits:
+                cluster_mask |= bit
+        
+        features.append(QueryFeatures(
+            query_lower=query,
+            word_count=len(query.split()),
+            has_highcomp_kw='competitive' in hits,
+            has_industry_kw='industry' in hits,
+            has_feature_kw='feature' in hits,
+            cluster_mask=cluster_mask,
+            n_competitors=len(result.get('competitors', []))
+        ))
+    
+    return features
+
+
 class TimelineSimulator:
     """Feature #10: Simulate visibility improvement over time"""
     
@@ -355,8 +569,7 @@ class TimelineSimulator:
             effort = improvement.get('effort', 'Medium')
             
             # Parse impact
-            import re
-            impact_nums = re.findall(r'(\d+)', impact)
+            impact_nums = _IMPACT_NUM_RE.findall(impact)
             impact_value = float(impact_nums[0]) if impact_nums else 10
             
             # Apply diminishing returns
@@ -364,7 +577,7 @@ class TimelineSimulator:
             cumulative_score = min(100, cumulative_score + effective_impact)
             
             # Calculate effort
-            effort_points = {'Low': 1, 'Medium': 2, 'High': 3}.get(effort, 2)
+            effort_points = _EFFORT_POINTS.get(effort, 2)
             cumulative_effort += effort_points
             
             timeline.append({
@@ -406,22 +619,31 @@ class AdvancedAnalytics:
     ) -> Dict[str, Any]:
         """Run all advanced analytics"""
         
-        # Feature #6: Query Difficulty
-        difficulty = self.difficulty_analyzer.analyze_difficulty(results)
-        
-        # Feature #7: Recommendations
-        recommendations = self.rec_engine.generate_recommendations(
-            gap_analysis or {},
-            competitor_insights or {},
-            difficulty,
-            results
-        )
-        
-        # Feature #8: Missed Opportunities
-        opportunities = self.opp_detector.detect_opportunities(results)
-        
-        # Feature #9: Competitor Clustering
-        clusters = self.clustering.cluster_competitors(results)
+        # Scan each query once; the analyzers below all read these features
+        features = extract_query_features(results)
+        
+        if len(results) >= PARALLEL_MIN_RESULTS:
+            # Opportunities and clustering are independent scans of results;
+            # run them alongside difficulty -> recommendations
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                opportunities_future = pool.submit(self.opp_detector.detect_opportunities, results, features)
+                clusters_future = pool.submit(self.clustering.cluster_competitors, results, features)
+                
+                difficulty, recommendations = self._difficulty_and_recommendations(
+                    results, features, gap_analysis, competitor_insights
+                )
+                opportunities = opportunities_future.result()
+                clusters = clusters_future.result()
+        else:
+            difficulty, recommendations = self._difficulty_and_recommendations(
+                results, features, gap_analysis, competitor_insights
+            )
+            
+            # Feature #8: Missed Opportunities
+            opportunities = self.opp_detector.detect_opportunities(results, features)
+            
+            # Feature #9: Competitor Clustering
+            clusters = self.clustering.cluster_competitors(results, features)
         
         # Feature #10: Timeline
         timeline = self.timeline_sim.simulate_timeline(recommendations[:5])
@@ -433,6 +655,27 @@ class AdvancedAnalytics:
             'competitor_clusters': clusters,
             'improvement_timeline': timeline
         }
+    
+    def _difficulty_and_recommendations(
+        self,
+        results: List[Dict[str, Any]],
+        features: List[QueryFeatures],
+        gap_analysis: Optional[Dict],
+        competitor_insights: Optional[Dict]
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Features #6 and #7: recommendations build on the difficulty scores"""
+        # Feature #6: Query Difficulty
+        difficulty = self.difficulty_analyzer.analyze_difficulty(results, features)
+        
+        # Feature #7: Recommendations
+        recommendations = self.rec_engine.generate_recommendations(
+            gap_analysis or {},
+            competitor_insights or {},
+            difficulty,
+            results
+        )
+        
+        return difficulty, recommendations
 
 
 if __name__ == "__main__":
@@ -3,26 +3,84 @@ Feature #2: AI-Powered Competitor Reverse Engineering
 Ask AI models WHY they chose specific competitors
 """
 
-import os
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import asyncio
+from typing import List, Dict, Any, Optional, NamedTuple
 from collections import Counter
+import heapq
 import hashlib
 import json
+import numpy as np
+
+from . import llm_cache
+from .keyword_matcher import KeywordMatcher, query_lower
+from .rate_limited_openai import NARRATIVE_MODEL, RateLimitedOpenAI, get_rate_limited_client
+
+# Insights for the same competitor and evidence are reused across jobs and
+# processes (stored in the shared LLM cache)
+INSIGHT_CACHE_TTL = 7 * 24 * 3600
+
+# Longest response excerpt an insight prompt uses
+SAMPLE_RESPONSE_CHARS = 300
+
+# Output budget for a strategic insight (2-3 short points); streaming stops once
+# the text reaches INSIGHT_MAX_CHARS
+INSIGHT_MAX_TOKENS = 150
+INSIGHT_MAX_CHARS = 600
+
+
+# Query keywords that place a competitor in a dominance area (checked in this order)
+DOMINANCE_AREAS = {
+    'Budget/Affordability': ('cheap', 'affordable', 'budget', 'low cost', 'inexpensive'),
+    'Quality/Premium': ('best', 'premium', 'luxury', 'high-quality', 'top'),
+    'Features/Variety': ('feature', 'option', 'variety', 'customizable'),
+    'Speed/Delivery': ('fast', 'quick', 'delivery', 'shipping', 'express'),
+    'Trust/Authority': ('trusted', 'reliable', 'review', 'rating', 'popular'),
+    'Sustainability': ('eco', 'organic', 'sustainable', 'green', 'natural'),
+    'Convenience': ('easy', 'convenient', 'simple', 'hassle-free')
+}
+
+# Strategy keywords that identify a competitor's key strength (first match wins)
+STRENGTH_KEYWORDS = {
+    'pricing': ('price', 'affordable', 'budget', 'cheap', 'cost'),
+    'quality': ('quality', 'premium', 'best', 'excellent'),
+    'features': ('feature', 'option', 'variety', 'selection'),
+    'trust': ('trust', 'reliable', 'reputation', 'review', 'popular'),
+    'innovation': ('innovative', 'technology', 'modern', 'advanced'),
+    'service': ('service', 'support', 'customer', 'experience'),
+    'availability': ('available', 'accessible', 'coverage', 'delivery')
+}
+
+
+class ResultRecord(NamedTuple):
+    """Context of one result, shared by every competitor mentioned in it"""
+    query: str
+    query_lower: str
+    response: str
+    rank: Optional[int]
+    model: str
+    intent_category: str
+
+
+_dominance_matcher = KeywordMatcher(DOMINANCE_AREAS)
+_strength_matcher = KeywordMatcher(STRENGTH_KEYWORDS)
 
 
 class CompetitorInsights:
     """Reverse-engineer competitor strategies by asking AI why they were chosen"""
     
-    def __init__(self, brand_name: str, industry: str):
+    def __init__(self, brand_name: str, industry: str, client: Optional[RateLimitedOpenAI] = None):
         self.brand_name = brand_name
         self.industry = industry
-        openai_key = os.getenv('OPENAI_API_KEY')
-        self.client = OpenAI(api_key=openai_key) if openai_key else None
+        self._client = client
         
         # In-memory cache for insights
         self._cache: Dict[str, Dict[str, Any]] = {}
     
+    @property
+    def client(self) -> Optional[RateLimitedOpenAI]:
+        """Injected client, else the shared rate-limited one (None without an API key)"""
+        return self._client or get_rate_limited_client()
+    
     def _generate_cache_key(self, results: List[Dict[str, Any]]) -> str:
         """Generate cache key from competitor mentions"""
         competitors = []
@@ -33,7 +91,7 @@ class CompetitorInsights:
         key_string = json.dumps(sorted(competitors))
         return hashlib.md5(key_string.encode()).hexdigest()
     
-    def analyze_competitors(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_competitors(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         For each competitor, ask AI WHY they were chosen (CACHED)
         Returns strategic insights about each competitor
@@ -55,10 +113,11 @@ class CompetitorInsights:
         # Get insights for top competitors
         top_competitors = self._get_top_competitors(competitor_mentions, 8)
         
-        insights = []
-        for competitor, data in top_competitors.items():
-            insight = self._get_competitor_insight(competitor, data)
-            insights.append(insight)
+        # Ask about all top competitors concurrently
+        insights = list(await asyncio.gather(*(
+            self._get_competitor_insight(competitor, data)
+            for competitor, data in top_competitors.items()
+        )))
         
         # Generate dominance patterns
         patterns = self._identify_patterns(insights)
@@ -78,44 +137,53 @@ class CompetitorInsights:
         self._cache[cache_key] = result
         return result
     
-    def _extract_competitor_mentions(self, results: List[Dict]) -> Dict[str, List[Dict]]:
+    def _extract_competitor_mentions(self, results: List[Dict]) -> Dict[str, List[ResultRecord]]:
         """Extract all competitor mentions with context"""
         mentions = {}
         
         for result in results:
             competitors = result.get('competitors', [])
+            if not competitors:
+                continue
+            
+            # One record per result, shared by all its competitors;
+            # only the prompt excerpt of the response is kept
+            record = ResultRecord(
+                query=result.get('query', ''),
+                query_lower=query_lower(result),
+                response=result.get('response', '')[:SAMPLE_RESPONSE_CHARS],
+                rank=result.get('rank'),
+                model=result.get('model', ''),
+                intent_category=result.get('intent_category', '')
+            )
             
             for comp in competitors:
-                if comp not in mentions:
-                    mentions[comp] = []
-                
-                mentions[comp].append({
-                    'query': result.get('query', ''),
-                    'response': result.get('response', ''),
-                    'rank': result.get('rank'),
-                    'model': result.get('model', ''),
-                    'intent_category': result.get('intent_category', '')
-                })
+                mentions.setdefault(comp, []).append(record)
         
         return mentions
     
     def _get_top_competitors(self, competitor_mentions: Dict, n: int) -> Dict[str, List]:
         """Get top N competitors by mention frequency"""
-        sorted_competitors = sorted(
+        top_competitors = heapq.nlargest(
+            n,
             competitor_mentions.items(),
-            key=lambda x: len(x[1]),
-            reverse=True
+            key=lambda x: len(x[1])
         )
-        return dict(sorted_competitors[:n])
+        return dict(top_competitors)
     
-    def _get_competitor_insight(self, competitor: str, mentions: List[Dict]) -> Dict[str, Any]:
+    def _insight_cache_key(self, competitor: str, sample_queries: List[str], sample_responses: List[str]) -> str:
+        """Cache key for one insight prompt; query order doesn't change the key"""
+        key_string = json.dumps([competitor, self.industry, sorted(sample_queries), sample_responses])
+        return 'insight:' + hashlib.blake2b(key_string.encode()).hexdigest()
+    
+    async def _get_competitor_insight(self, competitor: str, mentions: List[ResultRecord]) -> Dict[str, Any]:
         """Ask AI why this competitor was chosen"""
         # Get sample contexts
-        sample_queries = [m['query'] for m in mentions[:5]]
-        sample_responses = [m['response'][:300] for m in mentions[:3]]
+        sample_queries = [m.query for m in mentions[:5]]
+        sample_responses = [m.response for m in mentions[:3]]
         
         # Analyze query categories
-        categories = [m['intent_category'] for m in mentions if m.get('intent_category')]
+        categories = [m.intent_category for m in mentions if m.intent_category]
         category_distribution = Counter(categories)
         
         # Ask AI for strategic insight
@@ -134,21 +202,45 @@ Identify the KEY strategic advantages that make {competitor} stand out. Focus on
 
 Provide 2-3 concise strategic insights. Be specific and actionable."""
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a competitive intelligence analyst. Provide sharp, strategic insights."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-            
-            strategy = response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error getting competitor insight: {e}")
-            strategy = f"{competitor} appears frequently in {len(mentions)} queries, suggesting strong market presence and brand recognition."
+        cache_key = self._insight_cache_key(competitor, sample_queries, sample_responses)
+        strategy = llm_cache.get(cache_key)
+        
+        if strategy is None:
+            try:
+                stream = await self.client.chat_completion(
+                    model=NARRATIVE_MODEL,
+                    messages=[
+                        {"role": "system", "content": "You are a competitive intelligence analyst. Provide sharp, strategic insights."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=INSIGHT_MAX_TOKENS,
+                    temperature=0.7,
+                    stream=True
+                )
+                
+                parts = []
+                length = 0
+                try:
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            parts.append(delta)
+                            length += len(delta)
+                            if length >= INSIGHT_MAX_CHARS:
+                                break
+                finally:
+                    # Drops the connection if we stopped reading early
+                    await stream.response.aclose()
+                
+                strategy = ''.join(parts).strip()
+                if not strategy:
+                    raise ValueError("empty completion")
+                
+                # Only real answers are cached; fallbacks are retried next time
+                llm_cache.put(cache_key, strategy, INSIGHT_CACHE_TTL)
+            except Exception as e:
+                print(f"Error getting competitor insight: {e}")
+                strategy = f"{competitor} appears frequently in {len(mentions)} queries, suggesting strong market presence and brand recognition."
         
         # Identify dominance areas
         dominance_areas = self._identify_dominance_areas(mentions)
@@ -163,63 +255,30 @@ Provide 2-3 concise strategic insights. Be specific and actionable."""
             'key_strength': self._extract_key_strength(strategy)
         }
     
-    def _identify_dominance_areas(self, mentions: List[Dict]) -> List[str]:
+    def _identify_dominance_areas(self, mentions: List[ResultRecord]) -> List[str]:
         """Identify where competitor dominates"""
-        query_keywords = ' '.join([m['query'].lower() for m in mentions])
-        
-        areas = []
-        
-        # Price/Budget
-        if any(kw in query_keywords for kw in ['cheap', 'affordable', 'budget', 'low cost', 'inexpensive']):
-            areas.append('Budget/Affordability')
+        # Scan each cached query in place, stopping once every area has matched
+        hits = set()
+        for m in mentions:
+            hits |= _dominance_matcher.match(m.query_lower)
+            if len(hits) == len(DOMINANCE_AREAS):
+                break
         
-        # Quality/Premium
-        if any(kw in query_keywords for kw in ['best', 'premium', 'luxury', 'high-quality', 'top']):
-            areas.append('Quality/Premium')
-        
-        # Features
-        if any(kw in query_keywords for kw in ['feature', 'option', 'variety', 'customizable']):
-            areas.append('Features/Variety')
-        
-        # Speed/Delivery
-        if any(kw in query_keywords for kw in ['fast', 'quick', 'delivery', 'shipping', 'express']):
-            areas.append('Speed/Delivery')
-        
-        # Trust/Reviews
-        if any(kw in query_keywords for kw in ['trusted', 'reliable', 'review', 'rating', 'popular']):
-            areas.append('Trust/Authority')
-        
-        # Sustainability
-        if any(kw in query_keywords for kw in ['eco', 'organic', 'sustainable', 'green', 'natural']):
-            areas.append('Sustainability')
-        
-        # Convenience
-        if any(kw in query_keywords for kw in ['easy', 'convenient', 'simple', 'hassle-free']):
-            areas.append('Convenience')
+        areas = [area for area in DOMINANCE_AREAS if area in hits]
         
         return areas if areas else ['General Market Presence']
     
-    def _calculate_avg_rank(self, mentions: List[Dict]) -> float:
+    def _calculate_avg_rank(self, mentions: List[ResultRecord]) -> float:
         """Calculate average ranking position"""
-        ranks = [m['rank'] for m in mentions if m.get('rank') is not None]
-        return round(sum(ranks) / len(ranks), 1) if ranks else 0
+        ranks = np.fromiter((m.rank for m in mentions if m.rank is not None), dtype=np.int32)
+        return round(float(ranks.mean()), 1) if ranks.size else 0
     
     def _extract_key_strength(self, strategy_text: str) -> str:
         """Extract primary strength from strategy text"""
-        strength_keywords = {
-            'pricing': ['price', 'affordable', 'budget', 'cheap', 'cost'],
-            'quality': ['quality', 'premium', 'best', 'excellent'],
-            'features': ['feature', 'option', 'variety', 'selection'],
-            'trust': ['trust', 'reliable', 'reputation', 'review', 'popular'],
-            'innovation': ['innovative', 'technology', 'modern', 'advanced'],
-            'service': ['service', 'support', 'customer', 'experience'],
-            'availability': ['available', 'accessible', 'coverage', 'delivery']
-        }
-        
-        strategy_lower = strategy_text.lower()
+        hits = _strength_matcher.match(strategy_text.lower())
         
-        for strength, keywords in strength_keywords.items():
-            if any(kw in strategy_lower for kw in keywords):
+        for strength in STRENGTH_KEYWORDS:
+            if strength in hits:
                 return strength.capitalize()
         
         return 'Brand Authority'
@@ -281,5 +340,5 @@ if __name__ == "__main__":
         }
     ]
     
-    analysis = analyzer.analyze_competitors(test_results)
+    analysis = asyncio.run(analyzer.analyze_competitors(test_results))
     print("Competitor Insights:", analysis)
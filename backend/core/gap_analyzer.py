@@ -4,20 +4,70 @@ Analyzes responses to identify WHY brand wasn't mentioned and what competitors h
 """
 
 import re
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
-import os
+import asyncio
+import functools
+from collections import defaultdict
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 import hashlib
 import json
+import numpy as np
+
+from . import llm_cache, openai_batch
+from .rate_limited_openai import SCORING_MODEL, RateLimitedOpenAI, get_rate_limited_client
+from .keyword_matcher import KeywordMatcher, query_lower
+
+# Query keywords per category; a query joins the first category it matches
+QUERY_CATEGORIES = {
+    'Price/Budget': ('cheap', 'affordable', 'budget', 'cost', 'price', 'inexpensive'),
+    'Quality/Premium': ('best', 'quality', 'premium', 'luxury', 'top', 'high-end'),
+    'Delivery/Speed': ('fast', 'delivery', 'shipping', 'quick', 'express'),
+    'Features/Options': ('feature', 'option', 'variety', 'selection', 'choice'),
+    'Reviews/Trust': ('review', 'rating', 'trusted', 'reliable', 'popular'),
+    'Sustainability': ('eco', 'organic', 'sustainable', 'green', 'natural'),
+    'Convenience': ('easy', 'convenient', 'simple', 'hassle-free')
+}
+
+_category_matcher = KeywordMatcher(QUERY_CATEGORIES)
+
+
+@functools.lru_cache(maxsize=64)
+def _group_query_indices(queries: Tuple[str, ...]) -> Tuple[Tuple[str, Tuple[int, ...]], ...]:
+    """
+    Positions of the (lowercased) queries in each category, in table order
+
+    Keyed on the query texts so re-analysing the same results (e.g. the
+    realtime and batch reason paths) skips the keyword scan.
+    """
+    groups = {category: [] for category in QUERY_CATEGORIES}
+    groups['General'] = []
+    
+    for i, query in enumerate(queries):
+        hits = _category_matcher.match(query)
+        
+        # First category (in table order) with a keyword in the query
+        category = next((c for c in QUERY_CATEGORIES if c in hits), 'General')
+        groups[category].append(i)
+    
+    # Remove empty groups
+    return tuple((k, tuple(v)) for k, v in groups.items() if v)
+
+
+# Completion settings for reason prompts, realtime or batched
+REASON_PARAMS = {'model': SCORING_MODEL, 'max_tokens': 150, 'temperature': 0.7}
 
 
 class GapAnalyzer:
     """Analyzes gaps between brand and competitors when brand is not mentioned"""
     
-    def __init__(self, brand_name: str):
+    def __init__(
+        self,
+        brand_name: str,
+        cache_ttl: Optional[int] = llm_cache.LLM_CACHE_TTL,
+        client: Optional[RateLimitedOpenAI] = None
+    ):
         self.brand_name = brand_name
-        openai_key = os.getenv('OPENAI_API_KEY')
-        self.client = OpenAI(api_key=openai_key) if openai_key else None
+        self._client = client
+        self.cache_ttl = cache_ttl
         
         # In-memory cache for analysis results
         self._cache: Dict[str, Dict[str, Any]] = {}
@@ -35,6 +85,27 @@ class GapAnalyzer:
             'customer service', 'support', 'warranty',
             'innovation', 'technology', 'modern'
         ]
+        
+        # One whole-word alternation over every theme, so a response is scanned
+        # once. Longest themes are tried first, and the zero-width lookahead lets
+        # a match start at every word boundary, so overlapping themes all count
+        by_length = sorted(enumerate(self.themes), key=lambda item: -len(item[1]))
+        self._theme_re = re.compile(r'\b(?=(?:' + '|'.join(
+            f'(?P<t{i}>{re.escape(theme)})' for i, theme in by_length
+        ) + r')\b)', re.I)
+        self._group_to_index = {f't{i}': i for i in range(len(self.themes))}
+        # A longer theme hides shorter themes starting at the same spot
+        # ('customer service' / 'customer'), so a match also counts those
+        self._contained_themes = [
+            [j for j, other in enumerate(self.themes)
+             if j != i and re.search(r'\b' + re.escape(other) + r'\b', theme)]
+            for i, theme in enumerate(self.themes)
+        ]
+    
+    @property
+    def client(self) -> Optional[RateLimitedOpenAI]:
+        """Injected client, else the shared rate-limited one (None without an API key)"""
+        return self._client or get_rate_limited_client()
     
     def _generate_cache_key(self, results: List[Dict[str, Any]]) -> str:
         """Generate cache key based on results"""
@@ -43,7 +114,7 @@ class GapAnalyzer:
         key_string = json.dumps(key_data, sort_keys=True)
         return hashlib.md5(key_string.encode()).hexdigest()
     
-    def analyze_non_mentions(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_non_mentions(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Analyze all queries where brand was NOT mentioned
         Returns gap analysis with reasons (CACHED for performance)
@@ -66,13 +137,13 @@ class GapAnalyzer:
             return result
         
         # Extract themes from competitor answers
-        theme_analysis = self._extract_themes(non_mentions)
+        theme_analysis, theme_hits = self._extract_themes(non_mentions)
         
         # Generate reasons using AI
-        reasons = self._generate_reasons(non_mentions, theme_analysis)
+        reasons = await self._generate_reasons(non_mentions, theme_analysis)
         
         # Calculate theme gaps
-        theme_gaps = self._calculate_theme_gaps(theme_analysis)
+        theme_gaps = self._calculate_theme_gaps(theme_analysis, theme_hits)
         
         # Generate executive summary
         summary = self._generate_summary(len(non_mentions), len(results), theme_gaps)
@@ -91,159 +162,218 @@ class GapAnalyzer:
         self._cache[cache_key] = result
         return result
     
-    def _extract_themes(self, non_mentions: List[Dict]) -> Dict[str, List[str]]:
-        """Extract what themes competitors emphasize in responses"""
-        theme_mentions = {theme: [] for theme in self.themes}
+    def _extract_themes(self, non_mentions: List[Dict]) -> Tuple[Dict[str, List[Dict]], np.ndarray]:
+        """
+        Extract what themes competitors emphasize in responses
+        
+        Returns up to 3 example mentions per theme, and a (responses x themes)
+        uint8 matrix marking which themes each response contains.
+        """
+        # Only themes that actually occur get an examples list
+        examples = defaultdict(list)
+        rows, cols = [], []
         
-        for result in non_mentions:
+        for i, result in enumerate(non_mentions):
             response = result.get('response', '').lower()
-            competitors = result.get('competitors', [])
-            query = result.get('query', '')
             
-            # Check which themes appear in response
-            for theme in self.themes:
-                if theme in response:
-                    theme_mentions[theme].append({
-                        'query': query,
-                        'competitors': competitors,
-                        'context': self._extract_context(response, theme)
-                    })
+            # Check which themes appear in response, keeping the first occurrence of each
+            seen = set()
+            for match in self._theme_re.finditer(response):
+                matched = self._group_to_index[match.lastgroup]
+                for t in (matched, *self._contained_themes[matched]):
+                    if t in seen:
+                        continue
+                    seen.add(t)
+                    rows.append(i)
+                    cols.append(t)
+                    
+                    theme_examples = examples[self.themes[t]]
+                    if len(theme_examples) < 3:
+                        theme_examples.append({
+                            'query': result.get('query', ''),
+                            'competitors': result.get('competitors', []),
+                            'context': response[max(0, match.start() - 100):match.end(match.lastgroup) + 100].strip()
+                        })
         
-        return theme_mentions
+        hits = np.zeros((len(non_mentions), len(self.themes)), dtype=np.uint8)
+        hits[rows, cols] = 1
+        return examples, hits
     
-    def _extract_context(self, text: str, keyword: str, window: int = 100) -> str:
-        """Extract surrounding context for a keyword"""
-        idx = text.find(keyword)
-        if idx == -1:
-            return ""
+    def _calculate_theme_gaps(self, examples: Dict[str, List[Dict]], hits: np.ndarray) -> Dict[str, Any]:
+        """Calculate which themes brand is missing, most frequent first"""
+        frequency = hits.sum(axis=0, dtype=np.int64)
         
-        start = max(0, idx - window)
-        end = min(len(text), idx + len(keyword) + window)
-        return text[start:end].strip()
-    
-    def _calculate_theme_gaps(self, theme_analysis: Dict) -> Dict[str, Any]:
-        """Calculate which themes brand is missing"""
         gaps = {}
+        # Stable sort keeps theme-list order among equally frequent themes
+        for t in np.argsort(-frequency, kind='stable'):
+            count = int(frequency[t])
+            if count == 0:
+                break
+            
+            theme = self.themes[t]
+            gaps[theme] = {
+                'frequency': count,
+                'percentage': round(count / len(self.themes) * 100, 1),
+                'examples': examples[theme]  # Top 3 examples
+            }
         
-        for theme, mentions in theme_analysis.items():
-            if len(mentions) > 0:
-                gaps[theme] = {
-                    'frequency': len(mentions),
-                    'percentage': round(len(mentions) / len(theme_analysis) * 100, 1),
-                    'examples': mentions[:3]  # Top 3 examples
-                }
-        
-        return dict(sorted(gaps.items(), key=lambda x: x[1]['frequency'], reverse=True))
+        return gaps
     
-    def _generate_reasons(self, non_mentions: List[Dict], theme_analysis: Dict) -> List[Dict[str, str]]:
+    async def _generate_reasons(self, non_mentions: List[Dict], theme_analysis: Dict) -> List[Dict[str, str]]:
         """Use AI to generate human-readable reasons for non-mentions"""
-        reasons = []
+        # Ask about the top query groups concurrently
+        return list(await asyncio.gather(*(
+            self._generate_reason(group_name, queries)
+            for group_name, queries in self._top_query_groups(non_mentions)
+        )))
+    
+    async def _generate_reason(self, group_name: str, queries: List[Dict]) -> Dict[str, Any]:
+        """Ask AI why the brand was missing from one query group"""
+        messages = self._reason_messages(queries[0])
+        cache_key = llm_cache.cache_key(REASON_PARAMS, messages)
+        reason_text = llm_cache.get(cache_key)
         
-        # Group by similar queries
-        query_groups = self._group_similar_queries(non_mentions)
+        if reason_text is None:
+            try:
+                response = await self.client.chat_completion(
+                    messages=messages,
+                    **REASON_PARAMS
+                )
+                
+                reason_text = response.choices[0].message.content.strip()
+                llm_cache.put(cache_key, reason_text, self.cache_ttl)
+            except Exception as e:
+                print(f"Error generating reason: {e}")
         
-        for group_name, queries in list(query_groups.items())[:5]:  # Top 5 groups
-            # Get sample query and response
-            sample = queries[0]
-            
-            prompt = f"""Analyze why the brand "{self.brand_name}" was NOT mentioned in this AI response.
+        return self._reason_record(group_name, queries, reason_text)
 
-Query: {sample['query']}
-
-AI Response: {sample['response'][:1000]}
+    async def iter_reasons(self, results: List[Dict[str, Any]]) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream the reasons of analyze_non_mentions as they are generated
 
-Competitors Mentioned: {', '.join(sample.get('competitors', [])[:5])}
+        Yields (query_category, text_chunk) pairs, one group after another, so a
+        dashboard can render each reason from its first token instead of waiting
+        for the whole completion. Cached and fallback reasons arrive as one chunk.
+        """
+        non_mentions = [r for r in results if not r.get('mentioned', False)]
 
-Provide a concise, actionable reason (2-3 sentences) explaining:
-1. What competitors emphasized that {self.brand_name} likely lacks
-2. Specific positioning gap or weakness
+        for group_name, queries in self._top_query_groups(non_mentions):
+            messages = self._reason_messages(queries[0])
+            cache_key = llm_cache.cache_key(REASON_PARAMS, messages)
+            reason_text = llm_cache.get(cache_key)
 
-Format: Direct, businesslike, actionable."""
+            if reason_text is not None:
+                yield group_name, reason_text
+                continue
 
+            parts = []
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a brand strategy analyst. Provide direct, actionable insights."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=150,
-                    temperature=0.7
+                stream = await self.client.chat_completion(
+                    messages=messages,
+                    stream=True,
+                    **REASON_PARAMS
                 )
-                
-                reason_text = response.choices[0].message.content.strip()
-                
-                reasons.append({
-                    'query_category': group_name,
-                    'query_count': len(queries),
-                    'reason': reason_text,
-                    'sample_query': sample['query']
-                })
+
+                try:
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            parts.append(delta)
+                            yield group_name, delta
+                finally:
+                    await stream.response.aclose()
+
+                reason_text = ''.join(parts).strip()
+                if reason_text:
+                    llm_cache.put(cache_key, reason_text, self.cache_ttl)
             except Exception as e:
-                print(f"Error generating reason: {e}")
-                reasons.append({
-                    'query_category': group_name,
-                    'query_count': len(queries),
-                    'reason': f"Competitors dominated this query category. {self.brand_name} may lack visibility or relevant positioning.",
-                    'sample_query': sample['query']
-                })
+                print(f"Error streaming reason: {e}")
+
+            # Nothing streamed: send the generic reason instead
+            if not parts:
+                yield group_name, self._reason_record(group_name, queries, None)['reason']
+
+    async def submit_reasons_batch(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Queue the reason prompts as an OpenAI batch instead of calling them now
         
-        return reasons
-    
-    def _group_similar_queries(self, results: List[Dict]) -> Dict[str, List[Dict]]:
-        """Group queries by category/intent"""
-        groups = {
-            'Price/Budget': [],
-            'Quality/Premium': [],
-            'Delivery/Speed': [],
-            'Features/Options': [],
-            'Reviews/Trust': [],
-            'Sustainability': [],
-            'Convenience': [],
-            'General': []
-        }
+        Returns:
+            Batch id for collect_reasons_batch, or None if every query mentioned the brand
+        """
+        non_mentions = [r for r in results if not r.get('mentioned', False)]
+        groups = self._top_query_groups(non_mentions)
+        if not groups:
+            return None
         
-        keywords = {
-            'Price/Budget': ['cheap', 'affordable', 'budget', 'cost', 'price', 'inexpensive'],
-            'Quality/Premium': ['best', 'quality', 'premium', 'luxury', 'top', 'high-end'],
-            'Delivery/Speed': ['fast', 'delivery', 'shipping', 'quick', 'express'],
-            'Features/Options': ['feature', 'option', 'variety', 'selection', 'choice'],
-            'Reviews/Trust': ['review', 'rating', 'trusted', 'reliable', 'popular'],
-            'Sustainability': ['eco', 'organic', 'sustainable', 'green', 'natural'],
-            'Convenience': ['easy', 'convenient', 'simple', 'hassle-free']
-        }
+        return await openai_batch.submit_batch([
+            openai_batch.chat_request(group_name, self._reason_messages(queries[0]), **REASON_PARAMS)
+            for group_name, queries in groups
+        ])
+    
+    async def collect_reasons_batch(self, batch_id: str, results: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Reasons from a batch started by submit_reasons_batch over the same results
         
-        for result in results:
-            query_lower = result.get('query', '').lower()
-            categorized = False
-            
-            for category, kw_list in keywords.items():
-                if any(kw in query_lower for kw in kw_list):
-                    groups[category].append(result)
-                    categorized = True
-                    break
-            
-            if not categorized:
-                groups['General'].append(result)
+        Returns:
+            Reasons in the same shape as analyze_non_mentions, or None while the batch is running
+        """
+        answers = await openai_batch.collect(batch_id)
+        if answers is None:
+            return None
         
-        # Remove empty groups
-        return {k: v for k, v in groups.items() if v}
+        non_mentions = [r for r in results if not r.get('mentioned', False)]
+        return [
+            self._reason_record(group_name, queries, answers.get(group_name))
+            for group_name, queries in self._top_query_groups(non_mentions)
+        ]
     
-    def _get_top_themes(self, theme_gaps: Dict, n: int) -> List[Dict]:
-        """Get top N missing themes"""
-        sorted_themes = sorted(
-            theme_gaps.items(),
-            key=lambda x: x[1]['frequency'],
-            reverse=True
+    def _top_query_groups(self, non_mentions: List[Dict]) -> List[Tuple[str, List[Dict]]]:
+        """The (up to) 5 query groups that get an AI-written reason"""
+        return list(self._group_similar_queries(non_mentions).items())[:5]
+    
+    def _reason_messages(self, sample: Dict) -> List[Dict[str, str]]:
+        """Chat messages asking why the brand was missing from a sample result"""
+        # Whitespace runs in scraped responses cost tokens but carry nothing
+        response = ' '.join(sample['response'][:1000].split())
+        competitors = ', '.join(sample.get('competitors', [])[:5])
+        
+        prompt = (
+            f'Why was "{self.brand_name}" absent? Query: {sample["query"]}. '
+            f'Response: {response}. Competitors: {competitors}. '
+            f'Answer 2 sentences: gap + positioning weakness.'
         )
         
+        return [
+            {"role": "system", "content": "Brand strategy analyst. Be direct and actionable."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _reason_record(self, group_name: str, queries: List[Dict], reason_text: Optional[str]) -> Dict[str, Any]:
+        """Reason entry for a query group; falls back to a generic reason without an AI answer"""
+        if not reason_text:
+            reason_text = f"Competitors dominated this query category. {self.brand_name} may lack visibility or relevant positioning."
+        
+        return {
+            'query_category': group_name,
+            'query_count': len(queries),
+            'reason': reason_text,
+            'sample_query': queries[0]['query']
+        }
+    
+    def _group_similar_queries(self, results: List[Dict]) -> Dict[str, List[Dict]]:
+        """Group queries by category/intent"""
+        indices = _group_query_indices(tuple(query_lower(r) for r in results))
+        return {category: [results[i] for i in idx] for category, idx in indices}
+    
+    def _get_top_themes(self, theme_gaps: Dict, n: int) -> List[Dict]:
+        """Get top N missing themes (theme_gaps is already sorted by frequency)"""
         return [
             {
                 'theme': theme,
                 'frequency': data['frequency'],
                 'impact': 'High' if data['frequency'] > 5 else 'Medium' if data['frequency'] > 2 else 'Low'
             }
-            for theme, data in sorted_themes[:n]
+            for theme, data in list(theme_gaps.items())[:n]
         ]
     
     def _generate_summary(self, non_mentions: int, total: int, theme_gaps: Dict) -> str:
@@ -276,5 +406,5 @@ if __name__ == "__main__":
         }
     ]
     
-    analysis = analyzer.analyze_non_mentions(test_results)
+    analysis = asyncio.run(analyzer.analyze_non_mentions(test_results))
     print("Gap Analysis:", analysis)
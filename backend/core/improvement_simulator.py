@@ -3,23 +3,114 @@ Feature #3: Improvement Simulator
 Predict how visibility score would change with brand improvements
 """
 
-import os
-from typing import List, Dict, Any
-from openai import OpenAI
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+import asyncio
+import heapq
+import json
 import random
 
+from . import llm_cache, openai_batch
+from .rate_limited_openai import SCORING_MODEL, RateLimitedOpenAI, get_rate_limited_client
+from .keyword_matcher import KeywordMatcher, query_lower
+
+# Query keywords marking each theme a brand is missing
+_THEME_KEYWORDS = {
+    'pricing': ('cheap', 'affordable', 'budget', 'price'),
+    'features': ('feature', 'option', 'variety'),
+    'trust': ('trust', 'review', 'reliable', 'popular'),
+    'availability': ('delivery', 'shipping', 'fast', 'available'),
+    'quality': ('best', 'quality', 'premium'),
+    'sustainability': ('eco', 'organic', 'sustainable')
+}
+
+# Compiled keyword -> theme index, built once at import
+_theme_matcher = KeywordMatcher(_THEME_KEYWORDS)
+
+
+class CountImpact(NamedTuple):
+    """Scoring constants and text for an improvement measured by item count"""
+    improvement_type: str
+    points_per_item: float
+    gap_theme: Optional[str]  # missing theme whose count adds to the score
+    gap_weight: float
+    boost_per_point: float
+    affected_share: float  # share of all queries affected, on top of the gap
+    examples_shown: int
+    description: str
+    explanation: str
+
+
+# Improvements key -> impact model, in the order impacts are reported
+_COUNT_IMPACTS = (
+    ('new_features', CountImpact(
+        'New Features', 2, 'features', 0.5, 1.2, 0.15, 3,
+        'Adding {count} new features: {examples}',
+        'New features address {gap} queries where brand lacked functionality. Expected to improve feature-focused query performance.'
+    )),
+    ('new_keywords', CountImpact(
+        'SEO Keywords', 1.5, None, 0, 2.0, 0.4, 3,  # Keywords have high impact
+        'Targeting {count} new keywords: {examples}',
+        'Strong SEO optimization. Keywords directly target queries where brand is absent. High potential for AI model indexing.'
+    )),
+    ('page_updates', CountImpact(
+        'Content Pages', 2.5, None, 0, 1.8, 0.35, 2,
+        'Creating {count} new pages: {examples}',
+        'New dedicated pages improve AI model awareness. Comparison and guide pages especially effective for visibility.'
+    )),
+)
+
+_PRICING_EXPLANATION = 'Pricing is mentioned in {gap} non-mention queries. Strategy adjustment addresses this gap directly.'
+
+# Structured output for the tagline rating: the model must return this JSON object
+TAGLINE_RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'tagline_rating',
+        'strict': True,
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'score': {'type': 'number'},
+                'explanation': {'type': 'string'}
+            },
+            'required': ['score', 'explanation'],
+            'additionalProperties': False
+        }
+    }
+}
+
+# Completion settings for the tagline rating prompt, realtime or batched
+TAGLINE_PARAMS = {
+    'model': SCORING_MODEL,
+    'max_tokens': 150,
+    'temperature': 0.7,
+    'response_format': TAGLINE_RESPONSE_FORMAT
+}
+
 
 class ImprovementSimulator:
     """Simulate visibility improvements based on brand changes"""
     
-    def __init__(self, brand_name: str, industry: str, current_score: float):
+    def __init__(
+        self,
+        brand_name: str,
+        industry: str,
+        current_score: float,
+        cache_ttl: Optional[int] = llm_cache.LLM_CACHE_TTL,
+        client: Optional[RateLimitedOpenAI] = None
+    ):
         self.brand_name = brand_name
         self.industry = industry
         self.current_score = current_score
-        openai_key = os.getenv('OPENAI_API_KEY')
-        self.client = OpenAI(api_key=openai_key) if openai_key else None
+        self._client = client
+        self.cache_ttl = cache_ttl
     
-    def simulate_improvement(
+    @property
+    def client(self) -> Optional[RateLimitedOpenAI]:
+        """Injected client, else the shared rate-limited one (None without an API key)"""
+        return self._client or get_rate_limited_client()
+    
+    async def simulate_improvement(
         self,
         results: List[Dict[str, Any]],
         improvements: Dict[str, Any]
@@ -35,11 +126,60 @@ class ImprovementSimulator:
             'pricing_strategy': str
         }
         """
+        return await self._simulate(results, improvements, batch_answers=None)
+    
+    async def simulate_improvement_batch(
+        self,
+        results: List[Dict[str, Any]],
+        improvements: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Queue the simulation's AI prompts as an OpenAI batch
+        
+        Returns a handle for collect_improvement_batch: {'batch_id', 'status'}.
+        batch_id is None when the improvements need no AI assessment.
+        """
+        if not improvements.get('new_tagline'):
+            return {'batch_id': None, 'status': 'completed'}
+        
+        batch_id = await openai_batch.submit_batch([
+            openai_batch.chat_request(
+                'tagline',
+                self._tagline_messages(improvements['new_tagline'], results),
+                **TAGLINE_PARAMS
+            )
+        ])
+        return {'batch_id': batch_id, 'status': await openai_batch.poll(batch_id)}
+    
+    async def collect_improvement_batch(
+        self,
+        batch_id: Optional[str],
+        results: List[Dict[str, Any]],
+        improvements: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Finish a simulation started by simulate_improvement_batch
+        
+        Returns the same result as simulate_improvement, or None while the batch is running
+        """
+        answers = await openai_batch.collect(batch_id) if batch_id else {}
+        if answers is None:
+            return None
+        
+        return await self._simulate(results, improvements, batch_answers=answers)
+    
+    async def _simulate(
+        self,
+        results: List[Dict[str, Any]],
+        improvements: Dict[str, Any],
+        batch_answers: Optional[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """Run the simulation; AI prompts are answered from batch_answers when given"""
         # Analyze current gaps
         gap_analysis = self._analyze_gaps(results)
         
         # Calculate impact of each improvement
-        impact_analysis = self._calculate_impacts(improvements, gap_analysis, results)
+        impact_analysis = await self._calculate_impacts(improvements, gap_analysis, results, batch_answers)
         
         # Predict new score
         predicted_score = self._predict_new_score(impact_analysis)
@@ -65,31 +205,12 @@ class ImprovementSimulator:
         """Analyze what's missing from current brand"""
         non_mentions = [r for r in results if not r.get('mentioned', False)]
         
-        # Extract themes from non-mention queries
-        missing_themes = {
-            'pricing': 0,
-            'features': 0,
-            'trust': 0,
-            'availability': 0,
-            'quality': 0,
-            'sustainability': 0
-        }
+        # Count themes of non-mention queries, one keyword scan per query
+        missing_themes = dict.fromkeys(_THEME_KEYWORDS, 0)
         
         for result in non_mentions:
-            query_lower = result.get('query', '').lower()
-            
-            if any(kw in query_lower for kw in ['cheap', 'affordable', 'budget', 'price']):
-                missing_themes['pricing'] += 1
-            if any(kw in query_lower for kw in ['feature', 'option', 'variety']):
-                missing_themes['features'] += 1
-            if any(kw in query_lower for kw in ['trust', 'review', 'reliable', 'popular']):
-                missing_themes['trust'] += 1
-            if any(kw in query_lower for kw in ['delivery', 'shipping', 'fast', 'available']):
-                missing_themes['availability'] += 1
-            if any(kw in query_lower for kw in ['best', 'quality', 'premium']):
-                missing_themes['quality'] += 1
-            if any(kw in query_lower for kw in ['eco', 'organic', 'sustainable']):
-                missing_themes['sustainability'] += 1
+            for theme in _theme_matcher.match(query_lower(result)):
+                missing_themes[theme] += 1
         
         return {
             'missing_themes': missing_themes,
@@ -97,47 +218,30 @@ class ImprovementSimulator:
             'total_queries': len(results)
         }
     
-    def _calculate_impacts(
+    async def _calculate_impacts(
         self,
         improvements: Dict[str, Any],
         gap_analysis: Dict,
-        results: List[Dict]
+        results: List[Dict],
+        batch_answers: Optional[Dict[str, str]] = None
     ) -> List[Dict[str, Any]]:
         """Calculate impact of each improvement"""
         impacts = []
         
         # Tagline impact
         if improvements.get('new_tagline'):
-            impact = self._assess_tagline_impact(
+            impact = await self._assess_tagline_impact(
                 improvements['new_tagline'],
                 gap_analysis,
-                results
-            )
-            impacts.append(impact)
-        
-        # Features impact
-        if improvements.get('new_features'):
-            impact = self._assess_features_impact(
-                improvements['new_features'],
-                gap_analysis
-            )
-            impacts.append(impact)
-        
-        # Keywords impact
-        if improvements.get('new_keywords'):
-            impact = self._assess_keywords_impact(
-                improvements['new_keywords'],
-                gap_analysis
+                results,
+                batch_answers
             )
             impacts.append(impact)
         
-        # Page updates impact
-        if improvements.get('page_updates'):
-            impact = self._assess_page_updates_impact(
-                improvements['page_updates'],
-                gap_analysis
-            )
-            impacts.append(impact)
+        # Features, keywords and page updates impact
+        for key, model in _COUNT_IMPACTS:
+            if improvements.get(key):
+                impacts.append(self._assess_count_impact(model, improvements[key], gap_analysis))
         
         # Pricing strategy impact
         if improvements.get('pricing_strategy'):
@@ -149,51 +253,41 @@ class ImprovementSimulator:
         
         return impacts
     
-    def _assess_tagline_impact(self, tagline: str, gap_analysis: Dict, results: List[Dict]) -> Dict:
+    async def _assess_tagline_impact(
+        self,
+        tagline: str,
+        gap_analysis: Dict,
+        results: List[Dict],
+        batch_answers: Optional[Dict[str, str]] = None
+    ) -> Dict:
         """Use AI to assess tagline effectiveness"""
-        # Get common query themes
-        query_sample = [r['query'] for r in results[:10]]
-        
-        prompt = f"""Analyze this new tagline for {self.brand_name} in the {self.industry} industry:
-
-Tagline: "{tagline}"
-
-Sample queries where brand currently struggles:
-{chr(10).join(f"- {q}" for q in query_sample[:5])}
-
-Rate the effectiveness of this tagline on a scale of 1-10 for:
-1. Addressing market gaps
-2. Memorability
-3. SEO value
-4. Competitive differentiation
-
-Provide overall impact score (1-10) and brief explanation (2 sentences)."""
-
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a brand strategy expert. Provide numerical ratings and concise analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
-            
-            analysis = response.choices[0].message.content.strip()
-            
-            # Extract score (simple parsing)
-            score = 7.0  # Default
-            if 'score' in analysis.lower() or '/' in analysis:
-                import re
-                numbers = re.findall(r'(\d+(?:\.\d+)?)\s*(?:/\s*10|out of 10)', analysis)
-                if numbers:
-                    score = float(numbers[0])
+        if batch_answers is not None:
+            rating = self._parse_tagline_rating(batch_answers.get('tagline'))
+        else:
+            messages = self._tagline_messages(tagline, results)
+            cache_key = llm_cache.cache_key(TAGLINE_PARAMS, messages)
+            rating = self._parse_tagline_rating(llm_cache.get(cache_key))
             
-        except Exception as e:
-            print(f"Error assessing tagline: {e}")
+            if rating is None:
+                try:
+                    response = await self.client.chat_completion(
+                        messages=messages,
+                        **TAGLINE_PARAMS
+                    )
+                    
+                    answer = response.choices[0].message.content
+                    rating = self._parse_tagline_rating(answer)
+                    if rating is None:
+                        raise ValueError(f"malformed rating: {answer!r}")
+                    llm_cache.put(cache_key, answer, self.cache_ttl)
+                except Exception as e:
+                    print(f"Error assessing tagline: {e}")
+        
+        if rating is None:
             score = 6.5
             analysis = "New tagline provides moderate improvement in brand positioning."
+        else:
+            score, analysis = rating
         
         return {
             'improvement_type': 'Tagline Update',
@@ -204,48 +298,54 @@ Provide overall impact score (1-10) and brief explanation (2 sentences)."""
             'affected_queries': int(len(results) * 0.3)  # Affects ~30% of queries
         }
     
-    def _assess_features_impact(self, features: List[str], gap_analysis: Dict) -> Dict:
-        """Assess impact of new features"""
-        feature_gap = gap_analysis['missing_themes'].get('features', 0)
+    def _tagline_messages(self, tagline: str, results: List[Dict]) -> List[Dict[str, str]]:
+        """Chat messages asking the model to rate a tagline"""
+        # Get common query themes
+        query_sample = [r['query'] for r in results[:5]]
         
-        impact_score = min(10, len(features) * 2 + (feature_gap * 0.5))
-        visibility_boost = impact_score * 1.2
+        prompt = (
+            f'{self.brand_name} ({self.industry}) new tagline: "{tagline}". '
+            f'Queries where it struggles: {"; ".join(query_sample)}. '
+            f'Rate it 1-10 overall and explain in 2 sentences.'
+        )
         
-        return {
-            'improvement_type': 'New Features',
-            'description': f'Adding {len(features)} new features: {", ".join(features[:3])}',
-            'impact_score': round(impact_score, 1),
-            'visibility_boost': round(visibility_boost, 1),
-            'explanation': f'New features address {feature_gap} queries where brand lacked functionality. Expected to improve feature-focused query performance.',
-            'affected_queries': feature_gap + int(gap_analysis['total_queries'] * 0.15)
-        }
+        return [
+            {"role": "system", "content": "Brand strategy expert."},
+            {"role": "user", "content": prompt}
+        ]
     
-    def _assess_keywords_impact(self, keywords: List[str], gap_analysis: Dict) -> Dict:
-        """Assess SEO keyword impact"""
-        impact_score = min(10, len(keywords) * 1.5)
-        visibility_boost = impact_score * 2.0  # Keywords have high impact
+    @staticmethod
+    def _parse_tagline_rating(answer: Optional[str]) -> Optional[Tuple[float, str]]:
+        """(score clamped to 1-10, explanation) from a structured answer; None if missing or malformed"""
+        if not answer:
+            return None
         
-        return {
-            'improvement_type': 'SEO Keywords',
-            'description': f'Targeting {len(keywords)} new keywords: {", ".join(keywords[:3])}',
-            'impact_score': round(impact_score, 1),
-            'visibility_boost': round(visibility_boost, 1),
-            'explanation': f'Strong SEO optimization. Keywords directly target queries where brand is absent. High potential for AI model indexing.',
-            'affected_queries': int(gap_analysis['total_queries'] * 0.4)
-        }
+        try:
+            data = json.loads(answer)
+            score = float(data['score'])
+            explanation = str(data['explanation']).strip()
+        except (ValueError, TypeError, KeyError):
+            return None
+        
+        return min(max(score, 1.0), 10.0), explanation
     
-    def _assess_page_updates_impact(self, pages: List[str], gap_analysis: Dict) -> Dict:
-        """Assess content page impact"""
-        impact_score = min(10, len(pages) * 2.5)
-        visibility_boost = impact_score * 1.8
+    def _assess_count_impact(self, model: 'CountImpact', items: List[str], gap_analysis: Dict) -> Dict:
+        """Assess an improvement whose impact grows with the number of items added"""
+        gap = gap_analysis['missing_themes'].get(model.gap_theme, 0) if model.gap_theme else 0
+        
+        impact_score = min(10, len(items) * model.points_per_item + gap * model.gap_weight)
+        visibility_boost = impact_score * model.boost_per_point
         
         return {
-            'improvement_type': 'Content Pages',
-            'description': f'Creating {len(pages)} new pages: {", ".join(pages[:2])}',
+            'improvement_type': model.improvement_type,
+            'description': model.description.format(
+                count=len(items),
+                examples=", ".join(items[:model.examples_shown])
+            ),
             'impact_score': round(impact_score, 1),
             'visibility_boost': round(visibility_boost, 1),
-            'explanation': f'New dedicated pages improve AI model awareness. Comparison and guide pages especially effective for visibility.',
-            'affected_queries': int(gap_analysis['total_queries'] * 0.35)
+            'explanation': model.explanation.format(gap=gap),
+            'affected_queries': gap + int(gap_analysis['total_queries'] * model.affected_share)
         }
     
     def _assess_pricing_impact(self, strategy: str, gap_analysis: Dict) -> Dict:
@@ -260,7 +360,7 @@ Provide overall impact score (1-10) and brief explanation (2 sentences)."""
             'description': f'New pricing: {strategy}',
             'impact_score': round(impact_score, 1),
             'visibility_boost': round(visibility_boost, 1),
-            'explanation': f'Pricing is mentioned in {pricing_gap} non-mention queries. Strategy adjustment addresses this gap directly.',
+            'explanation': _PRICING_EXPLANATION.format(gap=pricing_gap),
             'affected_queries': pricing_gap
         }
     
@@ -308,10 +408,8 @@ Provide overall impact score (1-10) and brief explanation (2 sentences)."""
         """Generate prioritized recommendations"""
         recommendations = []
         
-        # Sort by impact
-        sorted_impacts = sorted(impacts, key=lambda x: x['visibility_boost'], reverse=True)
-        
-        for impact in sorted_impacts[:3]:
+        # Three biggest impacts (ties keep their original order)
+        for impact in heapq.nlargest(3, impacts, key=lambda x: x['visibility_boost']):
             recommendations.append(
                 f"Priority: {impact['improvement_type']} - Expected +{impact['visibility_boost']}% visibility. {impact['explanation'][:100]}"
             )
@@ -343,5 +441,5 @@ if __name__ == "__main__":
     
     test_results = []
     
-    result = simulator.simulate_improvement(test_results, improvements)
+    result = asyncio.run(simulator.simulate_improvement(test_results, improvements))
     print("Simulation:", result)
@@ -1,26 +1,173 @@
 """
 Industry Detection Module
-Scrapes website and classifies industry using GPT-4
+Scrapes website and classifies industry using Gemini or OpenAI
 """
 
-import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+from bs4 import BeautifulSoup, UnicodeDammit
+from openai import AsyncOpenAI
 import google.generativeai as genai
 import httpx
+import codecs
 import os
 import asyncio
+import hashlib
+import heapq
+import json
+import re
+from typing import Dict, Optional
+import numpy as np
+
+from . import llm_cache
+from .keyword_matcher import KeywordMatcher
+from .rate_limited_openai import SCORING_MODEL
+
+# Try to import selectolax, but make it optional
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# Labels a classifier may answer with
+INDUSTRY_LABELS = (
+    "Meal Kits & Food Delivery",
+    "E-commerce & Retail",
+    "SaaS & Software",
+    "Health & Wellness",
+    "Travel & Hospitality",
+    "Financial Services",
+    "Education & E-learning",
+    "Startup Incubators & Accelerators",
+    "Marketing & Advertising",
+    "Real Estate",
+    "Automotive & EV",
+    "Other"
+)
+
+# Static instructions come first so every classification shares the same prefix
+INDUSTRY_PROMPT_HEAD = (
+    "Analyze this brand and website content to classify the industry.\n\n"
+    "Choose ONE industry from:\n"
+    + ''.join(f"- {label}\n" for label in INDUSTRY_LABELS)
+    + "\nRespond with ONLY the industry name, nothing else.\n\n"
+)
+
+
+# Picking one of a dozen labels needs neither a large model nor free-form output
+INDUSTRY_GEMINI_MODEL = os.getenv('INDUSTRY_GEMINI_MODEL', 'gemini-1.5-flash')
+INDUSTRY_MAX_TOKENS = 20
+
+# Keyword classification is trusted without an LLM when the top industry has at
+# least MIN_SCORE distinct keywords and leads the runner-up by MARGIN
+INDUSTRY_KEYWORD_MIN_SCORE = int(os.getenv('INDUSTRY_KEYWORD_MIN_SCORE', '4'))
+INDUSTRY_KEYWORD_MARGIN = int(os.getenv('INDUSTRY_KEYWORD_MARGIN', '3'))
+
+# Seconds to wait on Gemini before also asking OpenAI
+INDUSTRY_HEDGE_DELAY = float(os.getenv('INDUSTRY_HEDGE_DELAY', '1.5'))
+
+# Structured output restricts the OpenAI answer to exactly one label
+INDUSTRY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "industry",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"industry": {"type": "string", "enum": list(INDUSTRY_LABELS)}},
+            "required": ["industry"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def _industry_prompt_tail(brand_name: str, website_text: str) -> str:
+    """Per-brand part of the classification prompt"""
+    return f"Brand: {brand_name}\nWebsite content: {website_text}"
+
+
+# Page sections that carry no description of the business
+_BOILERPLATE_TAGS = ["script", "style", "nav", "footer", "header"]
+
+# Scraped homepage text is reused for an hour per site
+SCRAPE_CACHE_TTL = int(os.getenv('SCRAPE_CACHE_TTL', '3600'))
+
+# HTML read per homepage; generous because inlined scripts/styles often fill
+# the first tens of KB before any visible text
+SCRAPE_MAX_BYTES = int(os.getenv('SCRAPE_MAX_BYTES', str(256 * 1024)))
+
+# Detected industries are reused for the same brand/site, and for sites whose
+# homepage text embeds close to one already classified
+INDUSTRY_CACHE_TTL = int(os.getenv('INDUSTRY_CACHE_TTL', str(30 * 24 * 3600)))
+INDUSTRY_SIMILARITY_THRESHOLD = float(os.getenv('INDUSTRY_SIMILARITY_THRESHOLD', '0.9'))
+INDUSTRY_EMBEDDING_LIMIT = 5000
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBEDDING_INPUT_CHARS = 1000
+
+_EMBEDDINGS_KEY = 'industry:embeddings'
+
+# Runs of punctuation/whitespace, collapsed to one space before keyword matching
+_NON_WORD_RE = re.compile(r'\W+')
+# Plural endings ('meals', 'categories'; not 'class'), so plurals still hit singular keywords
+_PLURAL_RE = re.compile(r'(?<=\w)(ies|(?<!s)s)\b')
+
+
+def canonical_url(url: str) -> str:
+    """Host and path of a URL without scheme, 'www.' or trailing slash"""
+    url = re.sub(r'^[a-z]+://', '', url.strip().lower())
+    if url.startswith('www.'):
+        url = url[4:]
+    return url.rstrip('/')
+
+
+def _decode_html(html: bytes, encoding: Optional[str]) -> str:
+    """Decode with the header charset, else UTF-8, else let bs4 sniff <meta>/guess"""
+    if encoding:
+        return html.decode(encoding, errors='replace')
+    try:
+        # Pages are cut at SCRAPE_MAX_BYTES, often mid-character: final=False
+        # drops an incomplete trailing sequence instead of failing on it
+        return codecs.getincrementaldecoder('utf-8')().decode(html, final=False)
+    except UnicodeDecodeError:
+        return UnicodeDammit(html, is_html=True).unicode_markup or ''
+
+
+def extract_page_text(html: bytes, encoding: Optional[str] = None) -> str:
+    """Visible text of an HTML page, without scripts, styles and navigation"""
+    if SELECTOLAX_AVAILABLE:
+        # Parsed and walked in C (lexbor), far faster than a BeautifulSoup tree
+        tree = LexborHTMLParser(_decode_html(html, encoding))
+        for node in tree.css(','.join(_BOILERPLATE_TAGS)):
+            node.decompose()
+        return tree.root.text(separator=' ', strip=True).strip() if tree.root else ''
+    
+    soup = BeautifulSoup(_decode_html(html, encoding), 'html.parser')
+    
+    # Remove scripts, styles, nav, footer
+    for script in soup(_BOILERPLATE_TAGS):
+        script.decompose()
+    
+    # Extract text from key sections
+    return soup.get_text(separator=' ', strip=True)
 
 
 class IndustryDetector:
     def __init__(self):
         openai_key = os.getenv('OPENAI_API_KEY')
-        self.openai_client = OpenAI(api_key=openai_key) if openai_key else None
+        self.openai_client = AsyncOpenAI(api_key=openai_key) if openai_key else None
         self.google_key = os.getenv('GOOGLE_API_KEY')
         
+        # One pooled client for the scrape and the Gemini call, so connections are reused
+        self.http = httpx.AsyncClient(
+            timeout=10.0,
+            follow_redirects=True,
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        
         self.industry_keywords = {
             "Meal Kits & Food Delivery": ["meal", "recipe", "chef", "ingredients", "cooking", "food", "delivery", "meal kit"],
-            "SaaS & Software": ["platform", "dashboard", "API", "integration", "workflow", "software", "cloud", "saas"],
+            "SaaS & Software": ["platform", "dashboard", "api", "integration", "workflow", "software", "cloud", "saas"],
             "Health & Wellness": ["fitness", "nutrition", "wellness", "health", "exercise", "yoga", "meditation"],
             "E-commerce & Retail": ["shop", "store", "retail", "products", "shopping", "ecommerce", "online store"],
             "Travel & Hospitality": ["travel", "hotel", "booking", "vacation", "tourism", "hospitality"],
@@ -31,170 +178,281 @@ class IndustryDetector:
             "Real Estate": ["real estate", "property", "housing", "rental", "apartment", "home"],
             "Automotive & EV": ["electric vehicle", "ev", "automotive", "car", "vehicle", "automobile", "mobility"]
         }
+        
+        # Every keyword is its own group, so one scan reports which keywords occur;
+        # keywords are space-padded to match whole words of the normalised text
+        self._keyword_matcher = KeywordMatcher({
+            kw: (f' {kw} ',) for keywords in self.industry_keywords.values() for kw in keywords
+        })
+        
+        # Industries each keyword scores for
+        self._industries_by_keyword = {}
+        for industry, keywords in self.industry_keywords.items():
+            for kw in keywords:
+                self._industries_by_keyword.setdefault(kw, []).append(industry)
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http.aclose()
     
-    def scrape_website(self, url):
-        """Extract text from homepage"""
+    async def scrape_website(self, url):
+        """Extract text from homepage (reused for SCRAPE_CACHE_TTL seconds per site)"""
+        cache_key = 'scrape:' + canonical_url(url)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Add https:// if not present
             if not url.startswith(('http://', 'https://')):
                 url = 'https://' + url
             
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove scripts, styles, nav, footer
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
+            # Only the start of the page is read: the text is cut to 3000 chars anyway
+            html = bytearray()
+            async with self.http.stream('GET', url) as response:
+                async for chunk in response.aiter_bytes():
+                    html += chunk
+                    if len(html) >= SCRAPE_MAX_BYTES:
+                        break
+                encoding = response.charset_encoding
             
-            # Extract text from key sections
-            text = soup.get_text(separator=' ', strip=True)
+            text = extract_page_text(bytes(html[:SCRAPE_MAX_BYTES]), encoding)
             
             # Limit to first 3000 chars to save tokens
-            return text[:3000]
+            text = text[:3000]
         except Exception as e:
             print(f"Error scraping website: {e}")
             return ""
+        
+        # Failed or empty pages are retried next time
+        if text:
+            llm_cache.put(cache_key, text, SCRAPE_CACHE_TTL)
+        return text
     
     async def classify_with_gemini(self, brand_name, website_text):
         """Use Google Gemini to classify industry"""
         try:
-            prompt = f"""
-Analyze this brand and website content to classify the industry.
-
-Brand: {brand_name}
-Website content: {website_text}
-
-Choose ONE industry from:
-- Meal Kits & Food Delivery
-- E-commerce & Retail
-- SaaS & Software
-- Health & Wellness
-- Travel & Hospitality
-- Financial Services
-- Education & E-learning
-- Startup Incubators & Accelerators
-- Marketing & Advertising
-- Real Estate
-- Automotive & EV
-- Other
-
-Respond with ONLY the industry name, nothing else.
-"""
+            prompt = INDUSTRY_PROMPT_HEAD + _industry_prompt_tail(brand_name, website_text)
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent?key={self.google_key}",
-                    headers={"Content-Type": "application/json"},
-                    json={
-                        "contents": [{"parts": [{"text": prompt}]}],
-                        "generationConfig": {
-                            "temperature": 0.1,
-                            "maxOutputTokens": 100
-                        }
-                    },
-                    timeout=30.0
-                )
-                data = response.json()
-                
-                if "candidates" in data and len(data["candidates"]) > 0:
-                    result = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-                    return result
-                return "Other"
+            response = await self.http.post(
+                f"https://generativelanguage.googleapis.com/v1/models/{INDUSTRY_GEMINI_MODEL}:generateContent?key={self.google_key}",
+                headers={"Content-Type": "application/json"},
+                json={
+                    "contents": [{"parts": [{"text": prompt}]}],
+                    "generationConfig": {
+                        "temperature": 0.1,
+                        "maxOutputTokens": INDUSTRY_MAX_TOKENS
+                    }
+                },
+                timeout=30.0
+            )
+            data = response.json()
+            
+            if "candidates" in data and len(data["candidates"]) > 0:
+                result = data["candidates"][0]["content"]["parts"][0]["text"].strip()
+                return result
+            return "Other"
         except Exception as e:
             print(f"Error with Gemini classification: {e}")
             return "Other"
     
-    def classify_industry_with_llm(self, brand_name, website_text):
-        """Use OpenAI GPT-4 to classify industry"""
+    async def classify_industry_with_llm(self, brand_name, website_text):
+        """Use a small OpenAI model to classify industry"""
         try:
             if not self.openai_client:
                 return "Other"
-                
-            prompt = f"""
-Analyze this brand and website content to classify the industry.
-
-Brand: {brand_name}
-Website content: {website_text}
-
-Choose ONE industry from:
-- Meal Kits & Food Delivery
-- E-commerce & Retail
-- SaaS & Software
-- Health & Wellness
-- Travel & Hospitality
-- Financial Services
-- Education & E-learning
-- Startup Incubators & Accelerators
-- Marketing & Advertising
-- Real Estate
-- Automotive & EV
-- Other
-
-Respond with ONLY the industry name, nothing else.
-"""
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
+            response = await self.openai_client.chat.completions.create(
+                model=SCORING_MODEL,
+                messages=[
+                    {"role": "system", "content": INDUSTRY_PROMPT_HEAD},
+                    {"role": "user", "content": _industry_prompt_tail(brand_name, website_text)}
+                ],
                 temperature=0.1,
-                max_tokens=50
+                max_tokens=INDUSTRY_MAX_TOKENS,
+                response_format=INDUSTRY_RESPONSE_FORMAT
             )
             
-            return response.choices[0].message.content.strip()
+            return json.loads(response.choices[0].message.content)['industry']
         except Exception as e:
             print(f"Error with LLM classification: {e}")
             return "Other"
     
     def classify_industry_with_keywords(self, text):
         """Fallback: keyword-based classification"""
-        text_lower = text.lower()
-        scores = {}
-        
-        for industry, keywords in self.industry_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            scores[industry] = score
+        scores = self._keyword_scores(text)
         
         if max(scores.values()) > 0:
             return max(scores, key=scores.get)
         return "Other"
     
-    def detect_industry(self, brand_name, url):
+    def _confident_keyword_industry(self, text) -> Optional[str]:
+        """Keyword label when it leads clearly enough that an LLM call isn't needed"""
+        scores = self._keyword_scores(text)
+        top, runner_up = heapq.nlargest(2, scores.values())
+        
+        if top >= INDUSTRY_KEYWORD_MIN_SCORE and top - runner_up >= INDUSTRY_KEYWORD_MARGIN:
+            return max(scores, key=scores.get)
+        return None
+    
+    def _keyword_scores(self, text) -> Dict[str, int]:
+        """Distinct keywords of each industry occurring in text"""
+        # Whole words only, so 'api' doesn't fire on 'shapiro' or 'ev' on 'every'.
+        # Hyphens become spaces ('saas-based' -> 'saas based'), and a singularised
+        # copy follows the text so 'cars' and 'meal kits' still count; the '|'
+        # keeps a keyword from spanning the two copies
+        words = _NON_WORD_RE.sub(' ', text.lower())
+        singular = _PLURAL_RE.sub(lambda m: 'y' if m.group(1) == 'ies' else '', words)
+        found = self._keyword_matcher.match(f' {words} | {singular} ')
+        scores = dict.fromkeys(self.industry_keywords, 0)
+        
+        # One point per distinct keyword present; only the keywords found are visited
+        for keyword in found:
+            for industry in self._industries_by_keyword[keyword]:
+                scores[industry] += 1
+        
+        return scores
+    
+    async def detect_industry(self, brand_name, url):
         """Main method: detect industry from brand and URL"""
+        # Same brand and site as an earlier analysis
+        exact_key = 'industry:' + hashlib.sha256(f"{brand_name.strip().lower()}|{canonical_url(url)}".encode()).hexdigest()
+        industry = llm_cache.get(exact_key)
+        if industry is not None:
+            return industry
+        
         # Scrape website
-        website_text = self.scrape_website(url)
+        website_text = await self.scrape_website(url)
         
         if not website_text:
             return "Other"
         
-        # Try Google Gemini first (if available)
+        # Unambiguous homepages don't need an embedding or LLM call
+        industry = self._confident_keyword_industry(website_text)
+        if industry is not None:
+            llm_cache.put(exact_key, industry, INDUSTRY_CACHE_TTL)
+            return industry
+        
+        # A site with near-identical homepage text was classified before
+        embedding = await self._embed(website_text)
+        industry = self._similar_industry(embedding) if embedding is not None else None
+        
+        if industry is None:
+            industry, provider = await self._classify(brand_name, website_text)
+            # A keyword fallback (e.g. during an LLM outage) is only a guess;
+            # caching it would pin it on this and every similar site for a month
+            if provider is None:
+                return industry
+            if embedding is not None:
+                self._remember_embedding(embedding, industry)
+        
+        llm_cache.put(exact_key, industry, INDUSTRY_CACHE_TTL)
+        return industry
+    
+    async def _embed(self, website_text: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of the start of the homepage text (None without OpenAI)"""
+        if not self.openai_client:
+            return None
+        
+        try:
+            response = await self.openai_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=website_text[:EMBEDDING_INPUT_CHARS]
+            )
+        except Exception as e:
+            print(f"Error embedding website text: {e}")
+            return None
+        
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def _similar_industry(self, embedding: np.ndarray) -> Optional[str]:
+        """Industry of the most similar stored site, if it clears the similarity threshold"""
+        stored = llm_cache.get(_EMBEDDINGS_KEY)
+        if not stored:
+            return None
+        
+        labels, matrix = stored
+        if matrix.shape[1] != embedding.shape[0]:
+            return None
+        
+        # Rows are unit length, so the dot product is the cosine similarity
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        return labels[best] if similarities[best] >= INDUSTRY_SIMILARITY_THRESHOLD else None
+    
+    def _remember_embedding(self, embedding: np.ndarray, industry: str):
+        """Add a classified site to the similarity index, keeping the newest entries"""
+        def append(stored):
+            if stored and stored[1].shape[1] == embedding.shape[0]:
+                labels, matrix = stored
+                return (
+                    (labels + (industry,))[-INDUSTRY_EMBEDDING_LIMIT:],
+                    np.vstack([matrix, embedding])[-INDUSTRY_EMBEDDING_LIMIT:]
+                )
+            return (industry,), embedding[np.newaxis, :]
+        
+        # Read-modify-write in one transaction so concurrent jobs keep each other's entries
+        llm_cache.update(_EMBEDDINGS_KEY, append, None)
+    
+    async def _classify(self, brand_name, website_text):
+        """
+        Classify scraped text: Gemini (hedged with OpenAI), then keywords
+
+        Returns (industry, provider); provider is None for the keyword fallback.
+        """
+        providers = []
         if self.google_key:
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                industry = loop.run_until_complete(self.classify_with_gemini(brand_name, website_text))
-                loop.close()
-                if industry and industry != "Other":
-                    return industry
-            except Exception as e:
-                print(f"Gemini classification failed: {e}")
-        
-        # Try OpenAI if available
+            providers.append(("Gemini", self.classify_with_gemini))
         if self.openai_client:
-            try:
-                industry = self.classify_industry_with_llm(brand_name, website_text)
-                if industry and industry != "Other":
-                    return industry
-            except Exception as e:
-                print(f"OpenAI classification failed: {e}")
+            providers.append(("OpenAI", self.classify_industry_with_llm))
+        rank = {name: i for i, (name, _) in enumerate(providers)}
+        
+        # Start the preferred provider now and the next one only if it hasn't produced
+        # a label within INDUSTRY_HEDGE_DELAY; the first usable label wins
+        pending = {}
+        try:
+            for i, (name, classify) in enumerate(providers):
+                pending[asyncio.create_task(classify(brand_name, website_text))] = name
+                hedge_after = INDUSTRY_HEDGE_DELAY if i < len(providers) - 1 else None
+                
+                while pending:
+                    done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break
+                    
+                    for task in sorted(done, key=lambda t: rank[pending[t]]):
+                        provider = pending.pop(task)
+                        try:
+                            industry = task.result()
+                        except Exception as e:
+                            print(f"{provider} classification failed: {e}")
+                            continue
+                        if industry and industry != "Other":
+                            return industry, provider
+        finally:
+            # A label arrived: the slower provider's call is no longer needed
+            for task in pending:
+                task.cancel()
         
         # Fallback to keyword matching
-        return self.classify_industry_with_keywords(website_text)
+        return self.classify_industry_with_keywords(website_text), None
 
 
 # Example usage
 if __name__ == "__main__":
-    detector = IndustryDetector()
-    result = detector.detect_industry("HelloFresh", "hellofresh.com")
+    async def main():
+        detector = IndustryDetector()
+        try:
+            return await detector.detect_industry("HelloFresh", "hellofresh.com")
+        finally:
+            await detector.aclose()
+    
+    result = asyncio.run(main())
     print(f"Detected Industry: {result}")
+    
+    # Keyword fallback: whole words, plus plural and hyphenated forms
+    detector = IndustryDetector()
+    for sample in ["SaaS-based dashboards and APIs", "Electric cars and EVs", "Meal kits and recipes", "Every shapiro carefully"]:
+        print(f"{sample!r}: {detector.classify_industry_with_keywords(sample)} {detector._keyword_scores(sample)}")
@@ -0,0 +1,77 @@
+"""
+Keyword Matcher
+Match many labelled keyword groups against a text in a single pass
+"""
+
+import re
+from typing import Any, Dict, Iterable, Set
+
+# Try to import pyahocorasick, but make it optional
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    """
+    Substring matcher over groups of keywords
+
+    With pyahocorasick installed, all keywords are compiled into one
+    Aho-Corasick automaton so a text is scanned once regardless of how many
+    keywords there are. Otherwise each group is precompiled into a single
+    alternation regex, so a text is scanned once per group in C.
+    Matching is case-sensitive: pass lowercase keywords and lowercased text.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        """
+        Args:
+            groups: Mapping of label -> keywords that trigger it
+        """
+        self.groups = {label: tuple(keywords) for label, keywords in groups.items()}
+        self.automaton = None
+        self.patterns = []
+
+        if AHOCORASICK_AVAILABLE:
+            # A keyword may belong to several groups (e.g. 'organic')
+            labels_by_keyword: Dict[str, list] = {}
+            for label, keywords in self.groups.items():
+                for kw in keywords:
+                    labels_by_keyword.setdefault(kw, []).append(label)
+
+            if labels_by_keyword:
+                self.automaton = ahocorasick.Automaton()
+                for kw, labels in labels_by_keyword.items():
+                    self.automaton.add_word(kw, tuple(labels))
+                self.automaton.make_automaton()
+        else:
+            self.patterns = [
+                (label, re.compile('|'.join(map(re.escape, keywords))))
+                for label, keywords in self.groups.items()
+                if keywords
+            ]
+
+    def match(self, text: str) -> Set[str]:
+        """Return the labels of every group with a keyword occurring in text"""
+        if self.automaton is not None:
+            hits = set()
+            for _, labels in self.automaton.iter(text):
+                hits.update(labels)
+            return hits
+
+        return {label for label, pattern in self.patterns if pattern.search(text)}
+
+
+def query_lower(result: Dict[str, Any]) -> str:
+    """
+    Lowercased query of a result, computed once and cached on the result
+
+    Several analyzers match keywords against the same query; caching it under
+    '_query_lower' saves each of them lowercasing the text again.
+    """
+    lowered = result.get('_query_lower')
+    if lowered is None:
+        lowered = result['_query_lower'] = result.get('query', '').lower()
+    return lowered
@@ -0,0 +1,65 @@
+"""
+LLM Response Cache
+Content-addressed cache of chat completions, keyed by the exact request
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+# Try to import diskcache, but make it optional
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# Answers are shared across jobs and worker processes through the disk cache
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', './.cache/llm')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))
+
+_cache = None
+
+
+def _get_cache():
+    """Open the shared on-disk cache (in-memory dict without diskcache)"""
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(LLM_CACHE_DIR) if DISKCACHE_AVAILABLE else {}
+    return _cache
+
+
+def cache_key(params: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
+    """SHA-256 of the completion settings (model, max_tokens, ...) and messages"""
+    payload = json.dumps({'params': params, 'messages': messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get(key: str) -> Optional[Any]:
+    """Cached completion text (or other stored value), or None"""
+    return _get_cache().get(key)
+
+
+def put(key: str, value: Any, ttl: Optional[int] = LLM_CACHE_TTL):
+    """Store a completion text or other picklable value; ttl is ignored by the in-memory fallback"""
+    cache = _get_cache()
+    if DISKCACHE_AVAILABLE:
+        cache.set(key, value, expire=ttl)
+    else:
+        cache[key] = value
+
+
+def update(key: str, fn: Callable[[Optional[Any]], Any], ttl: Optional[int] = LLM_CACHE_TTL):
+    """
+    Replace the value at key with fn(current value or None), atomically
+
+    With diskcache the read and write share one transaction, so concurrent
+    worker processes can't overwrite each other's updates.
+    """
+    cache = _get_cache()
+    if DISKCACHE_AVAILABLE:
+        with cache.transact():
+            cache.set(key, fn(cache.get(key)), expire=ttl)
+    else:
+        cache[key] = fn(cache.get(key))
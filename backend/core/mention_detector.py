@@ -3,10 +3,18 @@ Mention Detector Module
 Detects brand mentions, rankings, and competitors in AI responses
 """
 
+import functools
+import logging
 import re
-from fuzzywuzzy import fuzz
+from collections import Counter
+import numpy as np
+from rapidfuzz import fuzz, process
 from typing import Tuple, List, Optional
 
+from .keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
 # Try to import spacy, but make it optional
 try:
     import spacy
@@ -15,34 +23,87 @@ except ImportError:
     SPACY_AVAILABLE = False
     print("Warning: spaCy not available. NER features will be limited.")
 
+# spaCy components extract_competitors doesn't need
+NER_DISABLED_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+NER_BATCH_SIZE = 64
+
+# Compiled once at import instead of on every response
+_NUM_LIST_RE = re.compile(r'(\d+)[\.\)]\s*\*?\*?([^\n]+)', re.IGNORECASE)
+_RANK_LINE_RE = re.compile(r'(\d+)[\.\)]\s*([^\n]+)', re.IGNORECASE)
+_TOP_RE = re.compile(r'(top|best)\s+(\d+)', re.IGNORECASE)
+_CAP_RE = re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b')
+_NUMBERED_CAP_RE = re.compile(r'\d+[\.\)]\s*\*?\*?([A-Z][a-zA-Z\s]+?)(?:\s*[-–—:]|\n|$)')
+
+_WORD_CHAR_RE = re.compile(r'\w')
+
+_ORDINAL_MAP = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    '1st': 1, '2nd': 2, '3rd': 3, '4th': 4, '5th': 5
+}
+# Every ordinal in one alternation so the text is scanned once; the zero-width
+# lookahead finds ordinals inside another ordinal's line too
+_ORDINAL_ALT_RE = re.compile(rf'\b(?=({"|".join(_ORDINAL_MAP)})\b[:\s]+([^\n]+))', re.IGNORECASE)
+
+# Sentiment keywords
+_SENTIMENT_KEYWORDS = {
+    'positive': ['best', 'excellent', 'great', 'top', 'recommended', 'popular', 'leading', 'trusted', 'quality', 'favorite', 'amazing', 'outstanding', 'perfect', 'ideal'],
+    'negative': ['however', 'but', 'expensive', 'limited', 'lacks', 'poor', 'disappointing', 'avoid', 'issue', 'problem', 'worst', 'bad', 'overpriced'],
+    'hesitant': ['some', 'might', 'could', 'may', 'potentially', 'sometimes', 'depending', 'mixed reviews', 'varies', 'uncertain']
+}
+# One group per keyword, labelled (sentiment, keyword), so a match tells
+# which distinct keywords occurred
+_sentiment_matcher = KeywordMatcher({
+    (sentiment, kw): [kw]
+    for sentiment, keywords in _SENTIMENT_KEYWORDS.items()
+    for kw in keywords
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _load_nlp():
+    """spaCy NER pipeline shared by every detector (None if unavailable)"""
+    if not SPACY_AVAILABLE:
+        return None
+    try:
+        # Download with: python -m spacy download en_core_web_sm
+        # Only ORG entities are used; the sm model's NER has its own
+        # tok2vec, so the rest of the pipeline can be skipped
+        return spacy.load("en_core_web_sm", disable=NER_DISABLED_PIPES)
+    except Exception:
+        print("Warning: spaCy model not loaded. Run: python -m spacy download en_core_web_sm")
+        return None
+
+
+def _is_word_boundary(text: str, i: int) -> bool:
+    """Same test as regex \\b: word/non-word transition at position i"""
+    before = i > 0 and _WORD_CHAR_RE.match(text[i - 1]) is not None
+    after = i < len(text) and _WORD_CHAR_RE.match(text[i]) is not None
+    return before != after
+
 
 class MentionDetector:
     def __init__(self, brand_name):
         self.brand_name = brand_name
+        self._brand_lower = brand_name.lower()
         self.brand_variations = self.generate_variations(brand_name)
         
-        # Load spaCy model for NER (download with: python -m spacy download en_core_web_sm)
-        self.nlp = None
-        if SPACY_AVAILABLE:
-            try:
-                self.nlp = spacy.load("en_core_web_sm")
-            except:
-                print("Warning: spaCy model not loaded. Run: python -m spacy download en_core_web_sm")
-                self.nlp = None
+        # spaCy model for NER, loaded once per process and shared
+        self.nlp = _load_nlp()
     
     def generate_variations(self, brand):
         """Generate common brand name variations"""
-        variations = [brand.lower()]
+        brand_lower = brand.lower()
+        variations = [brand_lower]
         
         # Remove common suffixes
         for suffix in [' inc', ' llc', ' corp', ' co', '.com', ' inc.', ' llc.']:
-            if brand.lower().endswith(suffix):
-                clean_name = brand.lower().replace(suffix, '').strip()
+            if brand_lower.endswith(suffix):
+                clean_name = brand_lower.replace(suffix, '').strip()
                 if clean_name not in variations:
                     variations.append(clean_name)
         
         # Add version without spaces
-        no_space = brand.lower().replace(' ', '')
+        no_space = brand_lower.replace(' ', '')
         if no_space not in variations:
             variations.append(no_space)
         
@@ -54,32 +115,48 @@ class MentionDetector:
             return False, 0.0, "none"
             
         text_lower = text.lower()
-        print(f"\n🔍 Searching for '{self.brand_name}' in response...")
-        print(f"   Variations: {self.brand_variations}")
-        print(f"   Text preview: {text[:200]}...")
+        # Lazy %-formatting: nothing is built unless debug logging is on
+        logger.debug("Searching for %r (variations: %s) in: %.200s", self.brand_name, self.brand_variations, text)
         
-        # Exact match - check each variation
-        for variant in self.brand_variations:
-            # Use word boundaries for better matching
-            pattern = r'\b' + re.escape(variant) + r'\b'
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                print(f"   ✅ Found exact match: '{variant}'")
-                return True, 1.0, "exact"
+        # Exact match - any variation, on word boundaries
+        variant = self._find_variation(text_lower)
+        if variant:
+            logger.debug("Found exact match: %r", variant)
+            return True, 1.0, "exact"
         
         # Fuzzy match (threshold 80% - lowered for better detection)
         words = text_lower.split()
         brand_word_count = len(self.brand_name.split())
         
-        for word_group in self.get_ngrams(words, max(1, brand_word_count)):
-            phrase = ' '.join(word_group)
-            ratio = fuzz.ratio(self.brand_name.lower(), phrase)
-            if ratio >= 80:
-                print(f"   ✅ Found fuzzy match: '{phrase}' (score: {ratio}%)")
+        phrases = [' '.join(group) for group in self.get_ngrams(words, max(1, brand_word_count))]
+        if phrases:
+            # One C++ pass scores every phrase. Scores are rounded to whole
+            # percents (as fuzzywuzzy did) and the first phrase reaching 80 wins
+            scores = np.rint(process.cdist([self._brand_lower], phrases, scorer=fuzz.ratio)[0])
+            hits = np.flatnonzero(scores >= 80)
+            if hits.size:
+                first = int(hits[0])
+                ratio = int(scores[first])
+                logger.debug("Found fuzzy match: %r (score: %d%%)", phrases[first], ratio)
                 return True, ratio/100, "fuzzy"
         
-        print(f"   ❌ No match found for '{self.brand_name}'")
+        logger.debug("No match found for %r", self.brand_name)
         return False, 0.0, "none"
     
+    def _find_variation(self, text_lower: str) -> Optional[str]:
+        """First brand variation occurring in text as a whole word, or None"""
+        # There are only a few short literal variations, so str.find plus a
+        # boundary check beats both a regex and an automaton here
+        for variant in self.brand_variations:
+            if not variant:
+                continue
+            idx = text_lower.find(variant)
+            while idx != -1:
+                if _is_word_boundary(text_lower, idx) and _is_word_boundary(text_lower, idx + len(variant)):
+                    return variant
+                idx = text_lower.find(variant, idx + 1)
+        return None
+
     def get_ngrams(self, words, n):
         """Generate n-grams from word list"""
         if n <= 0 or n > len(words):
@@ -88,12 +165,13 @@ class MentionDetector:
     
     def extract_ranking(self, text, brand_name):
         """Extract ranking position if brand is in a list"""
+        brand_lower = brand_name.lower()
+        
         # Pattern 1: Numbered lists (1. Brand, 2. Brand)
-        pattern1 = r'(\d+)[\.\)]\s*\*?\*?([^\n]+)'
-        matches = re.findall(pattern1, text, re.IGNORECASE)
+        matches = _NUM_LIST_RE.findall(text)
         
         for rank, line in matches:
-            if brand_name.lower() in line.lower():
+            if brand_lower in line.lower():
                 return int(rank), line.strip()
         
         # Pattern 2: Bullet points with order inference
@@ -103,76 +181,87 @@ class MentionDetector:
             stripped = line.strip()
             if stripped.startswith(('•', '-', '*', '●')):
                 rank += 1
-                if brand_name.lower() in stripped.lower():
+                if brand_lower in stripped.lower():
                     return rank, stripped
         
         # Pattern 3: "Top X" mentions
-        pattern3 = r'(top|best)\s+(\d+)'
-        match = re.search(pattern3, text, re.IGNORECASE)
-        if match and brand_name.lower() in text.lower():
+        match = _TOP_RE.search(text)
+        if match and brand_lower in text.lower():
             return None, "mentioned_in_top_section"
         
         # Pattern 4: First, Second, Third mentions
-        ordinal_map = {
-            'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
-            '1st': 1, '2nd': 2, '3rd': 3, '4th': 4, '5th': 5
-        }
-        for ordinal, num in ordinal_map.items():
-            pattern = rf'\b{ordinal}\b[:\s]+([^\n]+)'
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match and brand_name.lower() in match.group(1).lower():
-                return num, match.group(1).strip()
+        # First occurrence of each ordinal, checked in _ORDINAL_MAP order
+        # ('first' before 'second', ...) wherever they sit in the text
+        first_by_ordinal = {}
+        for match in _ORDINAL_ALT_RE.finditer(text):
+            first_by_ordinal.setdefault(match.group(1).lower(), match)
+        for ordinal, num in _ORDINAL_MAP.items():
+            match = first_by_ordinal.get(ordinal)
+            if match and brand_lower in match.group(2).lower():
+                return num, match.group(2).strip()
         
         return None, "mentioned_not_ranked"
     
-    def extract_competitors(self, text, brand_name):
+    def extract_competitors(self, text, brand_name, doc=None):
         """Extract competitor names using NER + brand-like patterns"""
+        brand_lower = brand_name.lower()
         competitors = set()
         
         # Use spaCy NER if available
         if self.nlp:
-            doc = self.nlp(text)
+            if doc is None:
+                doc = self.nlp(text)
             
             # Extract ORG entities
             for ent in doc.ents:
                 if ent.label_ == "ORG":
                     name = ent.text.strip()
+                    name_lower = name.lower()
                     # Filter out generic terms and the target brand
-                    if name.lower() not in ['the', 'a', 'an', 'inc', 'llc'] and \
-                       name.lower() != brand_name.lower() and \
+                    if name_lower not in ['the', 'a', 'an', 'inc', 'llc'] and \
+                       name_lower != brand_lower and \
                        len(name) > 2:
                         competitors.add(name)
         
         # Pattern matching for brand-like mentions
         # Look for capitalized words/phrases in lists
-        pattern = r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b'
-        matches = re.findall(pattern, text)
+        matches = _CAP_RE.findall(text)
         
         for match in matches:
             # Filter criteria
-            if match.lower() != brand_name.lower() and \
+            if match.lower() != brand_lower and \
                len(match) > 3 and \
                match not in ['The', 'This', 'That', 'These', 'Those', 'When', 'Where', 'What', 'Which']:
                 competitors.add(match)
         
         # Look for numbered list competitors
-        numbered_pattern = r'\d+[\.\)]\s*\*?\*?([A-Z][a-zA-Z\s]+?)(?:\s*[-–—:]|\n|$)'
-        numbered_matches = re.findall(numbered_pattern, text)
+        numbered_matches = _NUMBERED_CAP_RE.findall(text)
         
         for match in numbered_matches:
             clean_name = match.strip()
-            if clean_name.lower() != brand_name.lower() and len(clean_name) > 3:
+            if clean_name.lower() != brand_lower and len(clean_name) > 3:
                 competitors.add(clean_name)
         
         return list(competitors)[:10]  # Limit to top 10
     
+    def extract_competitors_batch(self, texts, brand_name):
+        """extract_competitors for many texts, running spaCy NER over them in batches"""
+        if not self.nlp:
+            return [self.extract_competitors(text, brand_name) for text in texts]
+        
+        docs = self.nlp.pipe(texts, batch_size=NER_BATCH_SIZE)
+        return [
+            self.extract_competitors(text, brand_name, doc)
+            for text, doc in zip(texts, docs)
+        ]
+    
     def extract_competitor_rank(self, text, competitor_name):
         """Extract rank for a specific competitor"""
-        pattern = r'(\d+)[\.\)]\s*([^\n]+)'
-        matches = re.findall(pattern, text, re.IGNORECASE)
+        matches = _RANK_LINE_RE.findall(text)
+        competitor_lower = competitor_name.lower()
         
         for rank, line in matches:
-            if competitor_name.lower() in line.lower():
+            if competitor_lower in line.lower():
                 return int(rank)
         
         return None
@@ -189,8 +278,16 @@ class MentionDetector:
         
         return min(confidence, 1.0)
     
-    def analyze_response(self, response_text):
-        """Complete analysis of a response"""
+    def analyze_responses(self, response_texts):
+        """analyze_response for many responses, with one batched NER pass"""
+        competitor_lists = self.extract_competitors_batch(response_texts, self.brand_name)
+        return [
+            self.analyze_response(text, competitors)
+            for text, competitors in zip(response_texts, competitor_lists)
+        ]
+    
+    def analyze_response(self, response_text, competitors=None):
+        """Complete analysis of a response (competitors may be precomputed)"""
         # Detect brand mention
         mentioned, fuzzy_score, match_type = self.detect_brand_mention(response_text)
         
@@ -201,7 +298,8 @@ class MentionDetector:
             rank, rank_context = self.extract_ranking(response_text, self.brand_name)
         
         # Extract competitors
-        competitors = self.extract_competitors(response_text, self.brand_name)
+        if competitors is None:
+            competitors = self.extract_competitors(response_text, self.brand_name)
         
         # Calculate confidence
         confidence = self.calculate_confidence(mentioned, fuzzy_score, rank is not None)
@@ -261,14 +359,11 @@ class MentionDetector:
         end = min(len(text), brand_idx + len(self.brand_name) + 200)
         context = text[start:end].lower()
         
-        # Sentiment keywords
-        positive_kw = ['best', 'excellent', 'great', 'top', 'recommended', 'popular', 'leading', 'trusted', 'quality', 'favorite', 'amazing', 'outstanding', 'perfect', 'ideal']
-        negative_kw = ['however', 'but', 'expensive', 'limited', 'lacks', 'poor', 'disappointing', 'avoid', 'issue', 'problem', 'worst', 'bad', 'overpriced']
-        hesitant_kw = ['some', 'might', 'could', 'may', 'potentially', 'sometimes', 'depending', 'mixed reviews', 'varies', 'uncertain']
-        
-        pos_count = sum(1 for kw in positive_kw if kw in context)
-        neg_count = sum(1 for kw in negative_kw if kw in context)
-        hes_count = sum(1 for kw in hesitant_kw if kw in context)
+        # Distinct sentiment keywords in the context, all found in one scan
+        counts = Counter(sentiment for sentiment, _ in _sentiment_matcher.match(context))
+        pos_count = counts['positive']
+        neg_count = counts['negative']
+        hes_count = counts['hesitant']
         
         if neg_count > pos_count:
             return 'Negative'
@@ -188,9 +188,9 @@ class ModelBehaviorAnalyzer:
         
         # Emerging brand bias detection
         total_queries = sum(s['total_queries'] for s in model_stats.values())
-        avg_mention_rate = sum(s['mention_rate'] for s in model_stats.values()) / len(model_stats)
+        avg_mention_rate = sum(s['mention_rate'] for s in model_stats.values()) / len(model_stats) if model_stats else 0
         
-        if avg_mention_rate < 40:
+        if model_stats and avg_mention_rate < 40:
             insights.append(f"📊 **General Pattern**: All models show low brand recognition ({avg_mention_rate:.1f}% avg). {self.brand_name} may benefit from AI-specific SEO optimization and brand authority building.")
         
         return insights
@@ -0,0 +1,93 @@
+"""
+OpenAI Batch API
+Submit chat completions that don't need an immediate answer as one batch job
+(half the price of realtime calls, results within the completion window)
+"""
+
+import io
+import json
+from typing import Dict, List, Optional
+from openai import AsyncOpenAI
+
+from .openai_client import get_client
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batch states after which nothing more will be produced
+BATCH_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def _get_client() -> AsyncOpenAI:
+    """Shared client for batch calls (the running loop's pooled client)"""
+    return get_client()
+
+
+def chat_request(custom_id: str, messages: List[Dict[str, str]], **params) -> Dict:
+    """One line of a batch input file: a chat completion identified by custom_id"""
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {'messages': messages, **params}
+    }
+
+
+async def submit_batch(requests: List[Dict]) -> str:
+    """
+    Upload requests as a JSONL file and start a batch over them
+
+    Returns:
+        Batch id to pass to poll() / collect()
+    """
+    client = _get_client()
+
+    payload = '\n'.join(json.dumps(request) for request in requests).encode()
+    input_file = await client.files.create(
+        file=('batch.jsonl', io.BytesIO(payload)),
+        purpose='batch'
+    )
+
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW
+    )
+    return batch.id
+
+
+async def poll(batch_id: str) -> str:
+    """Current status of a batch (validating, in_progress, completed, ...)"""
+    batch = await _get_client().batches.retrieve(batch_id)
+    return batch.status
+
+
+async def collect(batch_id: str) -> Optional[Dict[str, str]]:
+    """
+    Download the answers of a completed batch
+
+    Returns:
+        Mapping of custom_id -> message content for every request that
+        succeeded, or None while the batch is still running
+    """
+    client = _get_client()
+    batch = await client.batches.retrieve(batch_id)
+
+    if batch.status not in BATCH_TERMINAL_STATUSES:
+        return None
+    if not batch.output_file_id:
+        return {}
+
+    output = await client.files.content(batch.output_file_id)
+
+    answers = {}
+    for line in output.text.splitlines():
+        if not line:
+            continue
+        record = json.loads(line)
+        response = record.get('response') or {}
+        if response.get('status_code') != 200:
+            continue
+        answers[record['custom_id']] = response['body']['choices'][0]['message']['content'].strip()
+
+    return answers
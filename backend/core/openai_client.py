@@ -0,0 +1,36 @@
+"""
+Shared OpenAI Client
+One AsyncOpenAI per event loop with a keep-alive connection pool, so analyses
+reuse open TLS connections instead of building a new HTTP client each time
+"""
+
+import asyncio
+import os
+import weakref
+import httpx
+from openai import AsyncOpenAI
+
+# Pool sized above OPENAI_CONCURRENCY so batch-file calls don't queue behind completions
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '20'))
+
+# httpx pools belong to the loop that opened them, so keep one client per loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client() -> AsyncOpenAI:
+    """AsyncOpenAI shared by every caller on the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(600.0, connect=5.0)
+            )
+        )
+    return client
@@ -0,0 +1,123 @@
+"""
+Rate-Limited OpenAI Client
+Chat completions under a concurrency cap and per-minute request/token budgets,
+with exponential backoff when the API still answers 429
+"""
+
+import asyncio
+import os
+import random
+import time
+import weakref
+from typing import Any, Dict, Optional
+import openai
+from openai import AsyncOpenAI
+
+from .openai_client import get_client
+
+# Defaults sized for a standard GPT-4 tier; override per deployment
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', '500'))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', '90000'))
+OPENAI_CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', '10'))
+
+# Short scoring/explanation prompts don't need a large model; strategic
+# narratives keep the stronger one
+SCORING_MODEL = os.getenv('SCORING_MODEL', 'gpt-4o-mini')
+NARRATIVE_MODEL = os.getenv('NARRATIVE_MODEL', 'gpt-4')
+
+
+class RateLimitedOpenAI:
+    """Wraps AsyncOpenAI chat completions with a semaphore and a token bucket"""
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        rpm: int = OPENAI_RPM,
+        tpm: int = OPENAI_TPM,
+        concurrency: int = OPENAI_CONCURRENCY,
+        max_attempts: int = 3
+    ):
+        """
+        Args:
+            client: Underlying client (the loop's shared pooled client if omitted)
+            rpm: Requests allowed per minute
+            tpm: Tokens (prompt estimate + max_tokens) allowed per minute
+            concurrency: Requests in flight at once
+            max_attempts: Tries per request when rate limited
+        """
+        self.client = client or get_client()
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_attempts = max_attempts
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._requests_available = float(rpm)
+        self._tokens_available = float(tpm)
+        self._last_refill = time.monotonic()
+
+    async def chat_completion(self, **params) -> Any:
+        """Same arguments and result as client.chat.completions.create"""
+        tokens = min(self._estimate_tokens(params), self.tpm)
+
+        async with self._semaphore:
+            for attempt in range(self.max_attempts):
+                await self._acquire(tokens)
+                try:
+                    return await self.client.chat.completions.create(**params)
+                except openai.RateLimitError:
+                    if attempt == self.max_attempts - 1:
+                        raise
+                    await asyncio.sleep(2 ** attempt + random.random())
+
+    @staticmethod
+    def _estimate_tokens(params: Dict[str, Any]) -> int:
+        """Rough token cost: ~4 characters per prompt token plus the output budget"""
+        prompt_chars = sum(len(m.get('content', '')) for m in params.get('messages', []))
+        return prompt_chars // 4 + params.get('max_tokens', 0)
+
+    def _refill(self):
+        """Top both buckets up for the time elapsed, capped at one minute's budget"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        self._requests_available = min(self.rpm, self._requests_available + elapsed * self.rpm / 60)
+        self._tokens_available = min(self.tpm, self._tokens_available + elapsed * self.tpm / 60)
+
+    async def _acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens fit in the budget, then take them"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests_available >= 1 and self._tokens_available >= tokens:
+                    self._requests_available -= 1
+                    self._tokens_available -= tokens
+                    return
+
+                # Sleep just long enough for the scarcer bucket to refill
+                wait = max(
+                    (1 - self._requests_available) / self.rpm,
+                    (tokens - self._tokens_available) / self.tpm
+                ) * 60
+                await asyncio.sleep(wait)
+
+
+# asyncio primitives belong to one event loop, so keep one shared client per loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_rate_limited_client() -> Optional[RateLimitedOpenAI]:
+    """
+    Client shared by every analyzer on the running event loop (one budget per process)
+
+    Returns None when OPENAI_API_KEY isn't set, so callers use their fallbacks.
+    """
+    if not os.getenv('OPENAI_API_KEY'):
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = RateLimitedOpenAI()
+    return client
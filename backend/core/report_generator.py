@@ -5,6 +5,7 @@ Generates Excel/CSV reports with comprehensive analysis
 
 import pandas as pd
 from datetime import datetime
+from typing import IO
 import os
 
 
@@ -181,14 +182,13 @@ class ReportGenerator:
         
         return model_stats
     
-    def save_excel(self, df, summary_df, category_df, model_df, output_dir='reports'):
-        """Save comprehensive Excel report"""
-        os.makedirs(output_dir, exist_ok=True)
-        
-        filename = f"AI_Visibility_Report_{self.brand_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = os.path.join(output_dir, filename)
-        
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+    def report_filename(self, extension):
+        """Build a timestamped report filename"""
+        return f"AI_Visibility_Report_{self.brand_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    def write_excel(self, df, summary_df, category_df, model_df, buf: IO[bytes]):
+        """Write comprehensive Excel report to a binary buffer"""
+        with pd.ExcelWriter(buf, engine='openpyxl') as writer:
             # Write all sheets
             summary_df.to_excel(writer, sheet_name='Summary', index=False)
             df.to_excel(writer, sheet_name='Detailed Results', index=False)
@@ -203,6 +203,19 @@ class ReportGenerator:
             competitor_df = self.create_competitor_analysis(df)
             if not competitor_df.empty:
                 competitor_df.to_excel(writer, sheet_name='Top Competitors', index=False)
+    
+    def write_csv(self, df, buf: IO[bytes]):
+        """Write simple CSV report to a binary buffer"""
+        df.to_csv(buf, index=False, encoding='utf-8')
+    
+    def save_excel(self, df, summary_df, category_df, model_df, output_dir='reports'):
+        """Save comprehensive Excel report"""
+        os.makedirs(output_dir, exist_ok=True)
+        
+        filepath = os.path.join(output_dir, self.report_filename('xlsx'))
+        
+        with open(filepath, 'wb') as f:
+            self.write_excel(df, summary_df, category_df, model_df, f)
         
         return filepath
     
@@ -210,10 +223,10 @@ class ReportGenerator:
         """Save simple CSV report"""
         os.makedirs(output_dir, exist_ok=True)
         
-        filename = f"AI_Visibility_Report_{self.brand_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        filepath = os.path.join(output_dir, filename)
+        filepath = os.path.join(output_dir, self.report_filename('csv'))
         
-        df.to_csv(filepath, index=False)
+        with open(filepath, 'wb') as f:
+            self.write_csv(df, f)
         return filepath
     
     def create_competitor_analysis(self, df):
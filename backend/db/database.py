@@ -2,11 +2,13 @@
 Database Connection and Session Management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+import asyncio
 import os
-from typing import Generator
+from typing import AsyncGenerator
 
 from .models import Base
 
@@ -31,27 +33,78 @@ else:
         echo=False
     )
 
-# Create session factory
+# Create session factory (used by Celery workers and init_db)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def init_db():
-    """Initialize database tables"""
-    # Drop all tables first to ensure clean migration
-    Base.metadata.drop_all(bind=engine)
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL to its async driver equivalent"""
+    if url.startswith('sqlite:'):
+        return url.replace('sqlite:', 'sqlite+aiosqlite:', 1)
+    if url.startswith('postgresql://'):
+        return url.replace('postgresql://', 'postgresql+asyncpg://', 1)
+    return url
+
+
+# Async engine for the API so queries don't block the event loop
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+
+if DATABASE_URL.startswith('sqlite'):
+    async_engine = create_async_engine(_async_database_url(DATABASE_URL), echo=False)
+else:
+    async_engine = create_async_engine(
+        _async_database_url(DATABASE_URL),
+        pool_size=POOL_SIZE,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_timeout=30,
+        echo=False
+    )
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores ON DELETE CASCADE unless foreign keys are switched on"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if DATABASE_URL.startswith('sqlite'):
+    event.listen(engine, 'connect', _enable_sqlite_foreign_keys)
+    event.listen(async_engine.sync_engine, 'connect', _enable_sqlite_foreign_keys)
+
+
+# Wipes every table before creating them; local development only
+DB_RESET_ON_START = os.getenv('DB_RESET_ON_START', 'false').lower() == 'true'
+
+
+def init_db(reset: bool = DB_RESET_ON_START):
+    """Create any missing tables (dropping all of them first only when reset is set)"""
+    if reset:
+        Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully")
 
 
-def get_db() -> Generator[Session, None, None]:
+async def warm_pool():
+    """Open pooled connections up front so first requests skip the connect handshake"""
+    async def _warm():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    # Connections are held concurrently, so the pool keeps each one
+    size = 1 if DATABASE_URL.startswith('sqlite') else POOL_SIZE
+    await asyncio.gather(*[_warm() for _ in range(size)])
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency for FastAPI to get database session
+    Dependency for FastAPI to get async database session
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # For testing with SQLite
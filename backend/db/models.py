@@ -3,8 +3,9 @@ Database Models
 SQLAlchemy models for PostgreSQL
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
@@ -34,6 +35,14 @@ class AnalysisJob(Base):
     completed_at = Column(DateTime)
     error_message = Column(Text)
     
+    # Results are removed by the database via ON DELETE CASCADE
+    results = relationship("Result", back_populates="job", passive_deletes=True)
+    
+    __table_args__ = (
+        # Supports the job list filtered by status, newest first
+        Index('ix_analysis_jobs_status_created_at', 'status', created_at.desc()),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -70,7 +79,7 @@ class Result(Base):
     __tablename__ = 'results'
     
     id = Column(Integer, primary_key=True, index=True)
-    job_id = Column(String(100), index=True, nullable=False)
+    job_id = Column(String(100), ForeignKey('analysis_jobs.job_id', ondelete='CASCADE'), index=True, nullable=False)
     query_id = Column(Integer)
     query_text = Column(Text, nullable=False)
     
@@ -103,6 +112,8 @@ class Result(Base):
     error = Column(Text)
     citations = Column(JSON)
     
+    job = relationship("AnalysisJob", back_populates="results")
+    
     def to_dict(self):
         return {
             'id': self.id,
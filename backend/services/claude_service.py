@@ -4,6 +4,7 @@ Production-grade Claude integration with error handling
 """
 
 import os
+import time
 import logging
 import asyncio
 from typing import Optional, Dict, Any
@@ -54,10 +55,11 @@ class ClaudeService:
             return self._error_response("Anthropic API key not configured")
         
         start_time = datetime.now()
+        started = time.perf_counter()
         model_name = model or self.model
         
         try:
-            logger.debug(f"🤖 Claude Query: {prompt[:100]}...")
+            logger.debug("🤖 Claude Query: %.100s...", prompt)
             
             # Add timeout
             response = await asyncio.wait_for(
@@ -71,7 +73,7 @@ class ClaudeService:
                 timeout=15.0
             )
             
-            elapsed = (datetime.now() - start_time).total_seconds()
+            elapsed = time.perf_counter() - started
             result = {
                 "provider": "claude",
                 "model": model_name,
@@ -87,17 +89,17 @@ class ClaudeService:
                 "success": True
             }
             
-            logger.debug(f"✅ Claude Response ({elapsed:.2f}s, {result['tokens']['total']} tokens)")
+            logger.debug("✅ Claude Response (%.2fs, %s tokens)", elapsed, result['tokens']['total'])
             return result
             
         except asyncio.TimeoutError:
-            logger.warning(f"⏱️  Claude timeout (>15s)")
+            logger.warning("⏱️  Claude timeout (>15s)")
             return self._error_response("Request timeout")
         except APIError as e:
-            logger.error(f"❌ Claude API Error: {str(e)}")
+            logger.error("❌ Claude API Error: %s", e)
             return self._error_response(f"Claude API error: {str(e)}")
         except Exception as e:
-            logger.error(f"❌ Unexpected error: {str(e)}")
+            logger.error("❌ Unexpected error: %s", e)
             return self._error_response(f"Unexpected error: {str(e)}")
     
     def _error_response(self, error_message: str) -> Dict[str, Any]:
@@ -4,10 +4,12 @@ Production-grade Gemini integration with error handling
 """
 
 import os
+import time
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,13 @@ class GeminiService:
         self.model = "gemini-pro"  # Using stable gemini-pro model
         self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
         
+        # One pooled client for every query, so keep-alive connections are reused
+        # (short timeout for faster failure detection)
+        self.http = httpx.AsyncClient(
+            timeout=12.0,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+        
         if self.available:
             logger.info("✅ Gemini service initialized")
         else:
@@ -53,74 +62,99 @@ class GeminiService:
             return self._error_response("Google API key not configured")
         
         start_time = datetime.now()
+        started = time.perf_counter()
         model_name = model or self.model
         
         try:
-            logger.debug(f"🤖 Gemini Query: {prompt[:100]}...")
+            logger.debug("🤖 Gemini Query: %.100s...", prompt)
             
-            # Reduce timeout for faster failure detection
-            async with httpx.AsyncClient(timeout=12.0) as client:
-                url = f"{self.base_url}/{model_name}:generateContent?key={self.api_key}"
-                
-                payload = {
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }],
-                    "generationConfig": {
-                        "temperature": temperature,
-                        "maxOutputTokens": max_tokens,
-                        "topP": 0.95,
-                        "topK": 40
-                    }
+            url = f"{self.base_url}/{model_name}:streamGenerateContent?alt=sse&key={self.api_key}"
+            
+            payload = {
+                "contents": [{
+                    "parts": [{"text": prompt}]
+                }],
+                "generationConfig": {
+                    "temperature": temperature,
+                    "maxOutputTokens": max_tokens,
+                    "topP": 0.95,
+                    "topK": 40
                 }
-                
-                response = await client.post(url, json=payload)
+            }
+            
+            # Streamed as server-sent events: text is collected while the rest is
+            # still being generated, and time to first token can be reported
+            parts = []
+            finish_reason = None
+            usage = {}
+            first_token = None
+            
+            async with self.http.stream(
+                "POST",
+                url,
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.is_error:
+                    await response.aread()
                 response.raise_for_status()
                 
-                data = response.json()
-                
-                if 'candidates' not in data or not data['candidates']:
-                    return self._error_response("No response from Gemini")
-                
-                candidate = data['candidates'][0]
-                if candidate.get('finishReason') != 'STOP':
-                    finish_reason = candidate.get('finishReason', 'UNKNOWN')
-                    logger.warning(f"⚠️  Gemini finished with reason: {finish_reason}")
-                
-                content = candidate['content']['parts'][0]['text']
-                
-                # Extract token counts if available
-                usage = data.get('usageMetadata', {})
-                tokens = {
-                    "prompt": usage.get('promptTokenCount', 0),
-                    "completion": usage.get('candidatesTokenCount', 0),
-                    "total": usage.get('totalTokenCount', 0)
-                }
-                
-                elapsed = (datetime.now() - start_time).total_seconds()
-                result = {
-                    "provider": "gemini",
-                    "model": model_name,
-                    "response": content,
-                    "tokens": tokens,
-                    "timestamp": start_time.isoformat(),
-                    "elapsed_seconds": elapsed,
-                    "error": None,
-                    "success": True
-                }
-                
-                logger.debug(f"✅ Gemini Response ({elapsed:.2f}s, {tokens['total']} tokens)")
-                return result
-                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    
+                    chunk = orjson.loads(line[5:])
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                if first_token is None:
+                                    first_token = time.perf_counter() - started
+                                parts.append(part['text'])
+                        finish_reason = candidate.get('finishReason') or finish_reason
+                    
+                    # Token counts arrive with the last chunk
+                    usage = chunk.get('usageMetadata') or usage
+            
+            if not parts:
+                return self._error_response("No response from Gemini")
+            
+            if finish_reason != 'STOP':
+                logger.warning("⚠️  Gemini finished with reason: %s", finish_reason or 'UNKNOWN')
+            
+            content = ''.join(parts)
+            
+            # Extract token counts if available
+            tokens = {
+                "prompt": usage.get('promptTokenCount', 0),
+                "completion": usage.get('candidatesTokenCount', 0),
+                "total": usage.get('totalTokenCount', 0)
+            }
+            
+            elapsed = time.perf_counter() - started
+            result = {
+                "provider": "gemini",
+                "model": model_name,
+                "response": content,
+                "tokens": tokens,
+                "timestamp": start_time.isoformat(),
+                "elapsed_seconds": elapsed,
+                "first_token_seconds": first_token,
+                "error": None,
+                "success": True
+            }
+            
+            logger.debug("✅ Gemini Response (%.2fs, %s tokens)", elapsed, tokens['total'])
+            return result
+            
         except httpx.HTTPStatusError as e:
             error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-            logger.error(f"❌ Gemini HTTP Error: {error_msg}")
+            logger.error("❌ Gemini HTTP Error: %s", error_msg)
             return self._error_response(error_msg)
         except httpx.TimeoutException:
             logger.error("❌ Gemini request timed out")
             return self._error_response("Request timeout")
         except Exception as e:
-            logger.error(f"❌ Unexpected error: {str(e)}")
+            logger.error("❌ Unexpected error: %s", e)
             return self._error_response(f"Unexpected error: {str(e)}")
     
     async def classify_industry(self, brand_name: str, website_text: str) -> str:
@@ -158,9 +192,13 @@ Respond with ONLY the industry name, nothing else."""
                 return industry
             return "Other"
         except Exception as e:
-            logger.error(f"❌ Industry classification failed: {e}")
+            logger.error("❌ Industry classification failed: %s", e)
             return "Other"
     
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http.aclose()
+    
     def _error_response(self, error_message: str) -> Dict[str, Any]:
         """Standard error response format"""
         return {
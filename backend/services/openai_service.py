@@ -4,6 +4,7 @@ Production-grade OpenAI integration with error handling
 """
 
 import os
+import time
 import logging
 import asyncio
 from typing import Optional, Dict, Any
@@ -54,10 +55,11 @@ class OpenAIService:
             return self._error_response("OpenAI API key not configured")
         
         start_time = datetime.now()
+        started = time.perf_counter()
         model_name = model or self.model
         
         try:
-            logger.debug(f"🤖 OpenAI Query: {prompt[:100]}...")
+            logger.debug("🤖 OpenAI Query: %.100s...", prompt)
             
             # Add timeout to prevent hanging
             response = await asyncio.wait_for(
@@ -71,7 +73,7 @@ class OpenAIService:
                 timeout=15.0  # 15 second timeout
             )
             
-            elapsed = (datetime.now() - start_time).total_seconds()
+            elapsed = time.perf_counter() - started
             result = {
                 "provider": "openai",
                 "model": model_name,
@@ -87,17 +89,17 @@ class OpenAIService:
                 "success": True
             }
             
-            logger.debug(f"✅ OpenAI Response ({elapsed:.2f}s, {result['tokens']['total']} tokens)")
+            logger.debug("✅ OpenAI Response (%.2fs, %s tokens)", elapsed, result['tokens']['total'])
             return result
             
         except asyncio.TimeoutError:
-            logger.warning(f"⏱️  OpenAI timeout (>15s)")
+            logger.warning("⏱️  OpenAI timeout (>15s)")
             return self._error_response("Request timeout")
         except OpenAIError as e:
-            logger.error(f"❌ OpenAI Error: {str(e)}")
+            logger.error("❌ OpenAI Error: %s", e)
             return self._error_response(f"OpenAI API error: {str(e)}")
         except Exception as e:
-            logger.error(f"❌ Unexpected error: {str(e)}")
+            logger.error("❌ Unexpected error: %s", e)
             return self._error_response(f"Unexpected error: {str(e)}")
     
     async def generate_queries(
@@ -138,10 +140,10 @@ Return as a numbered list, one query per line."""
                     if query:
                         queries.append(query)
             
-            logger.info(f"📝 Generated {len(queries)} queries via OpenAI")
+            logger.info("📝 Generated %s queries via OpenAI", len(queries))
             return queries
         except Exception as e:
-            logger.error(f"❌ Query generation failed: {e}")
+            logger.error("❌ Query generation failed: %s", e)
             return []
     
     async def classify_industry(self, brand_name: str, website_text: str) -> str:
@@ -4,10 +4,12 @@ Production-grade Perplexity integration with error handling
 """
 
 import os
+import time
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,13 @@ class PerplexityService:
         self.model = "llama-3.1-sonar-large-128k-online"
         self.base_url = "https://api.perplexity.ai"
         
+        # One pooled client for every query, so keep-alive connections are reused
+        # (short timeout for faster failure detection)
+        self.http = httpx.AsyncClient(
+            timeout=12.0,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+        
         if self.available:
             logger.info("✅ Perplexity service initialized")
         else:
@@ -53,78 +62,106 @@ class PerplexityService:
             return self._error_response("Perplexity API key not configured")
         
         start_time = datetime.now()
+        started = time.perf_counter()
         model_name = model or self.model
         
         try:
-            logger.debug(f"🤖 Perplexity Query: {prompt[:100]}...")
+            logger.debug("🤖 Perplexity Query: %.100s...", prompt)
             
-            async with httpx.AsyncClient(timeout=12.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                    **kwargs
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers
-                )
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": True,
+                **kwargs
+            }
+            
+            # Streamed as server-sent events: text is collected while the rest is
+            # still being generated, and time to first token can be reported
+            parts = []
+            citations = []
+            usage = {}
+            first_token = None
+            
+            async with self.http.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                content=orjson.dumps(payload),
+                headers=headers
+            ) as response:
+                if response.is_error:
+                    await response.aread()
                 response.raise_for_status()
                 
-                data = response.json()
-                
-                if 'choices' not in data or not data['choices']:
-                    return self._error_response("No response from Perplexity")
-                
-                choice = data['choices'][0]
-                content = choice['message']['content']
-                
-                # Extract citations if available
-                citations = data.get('citations', [])
-                
-                # Extract token counts if available
-                usage = data.get('usage', {})
-                tokens = {
-                    "prompt": usage.get('prompt_tokens', 0),
-                    "completion": usage.get('completion_tokens', 0),
-                    "total": usage.get('total_tokens', 0)
-                }
-                
-                elapsed = (datetime.now() - start_time).total_seconds()
-                result = {
-                    "provider": "perplexity",
-                    "model": model_name,
-                    "response": content,
-                    "tokens": tokens,
-                    "timestamp": start_time.isoformat(),
-                    "elapsed_seconds": elapsed,
-                    "error": None,
-                    "success": True,
-                    "citations": citations  # Unique to Perplexity
-                }
-                
-                logger.debug(f"✅ Perplexity Response ({elapsed:.2f}s, {tokens['total']} tokens, {len(citations)} citations)")
-                return result
-                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = line[5:].strip()
+                    if event == "[DONE]":
+                        break
+                    
+                    chunk = orjson.loads(event)
+                    choices = chunk.get('choices') or []
+                    delta = choices[0].get('delta', {}).get('content') if choices else None
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        parts.append(delta)
+                    
+                    # Citations and usage are repeated (and completed) on later chunks
+                    citations = chunk.get('citations') or citations
+                    usage = chunk.get('usage') or usage
+            
+            if not parts:
+                return self._error_response("No response from Perplexity")
+            
+            content = ''.join(parts)
+            
+            # Extract token counts if available
+            tokens = {
+                "prompt": usage.get('prompt_tokens', 0),
+                "completion": usage.get('completion_tokens', 0),
+                "total": usage.get('total_tokens', 0)
+            }
+            
+            elapsed = time.perf_counter() - started
+            result = {
+                "provider": "perplexity",
+                "model": model_name,
+                "response": content,
+                "tokens": tokens,
+                "timestamp": start_time.isoformat(),
+                "elapsed_seconds": elapsed,
+                "first_token_seconds": first_token,
+                "error": None,
+                "success": True,
+                "citations": citations  # Unique to Perplexity
+            }
+            
+            logger.debug("✅ Perplexity Response (%.2fs, %s tokens, %d citations)", elapsed, tokens['total'], len(citations))
+            return result
+            
         except httpx.HTTPStatusError as e:
             error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-            logger.error(f"❌ Perplexity HTTP Error: {error_msg}")
+            logger.error("❌ Perplexity HTTP Error: %s", error_msg)
             return self._error_response(error_msg)
         except httpx.TimeoutException:
             logger.error("❌ Perplexity request timed out")
             return self._error_response("Request timeout")
         except Exception as e:
-            logger.error(f"❌ Unexpected error: {str(e)}")
+            logger.error("❌ Unexpected error: %s", e)
             return self._error_response(f"Unexpected error: {str(e)}")
     
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http.aclose()
+    
     def _error_response(self, error_message: str) -> Dict[str, Any]:
         """Standard error response format"""
         return {
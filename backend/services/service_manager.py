@@ -5,6 +5,7 @@ Coordinates all AI services with fallback logic and parallel execution
 
 import logging
 import asyncio
+import httpx
 from typing import Dict, Any, List, Optional
 from .openai_service import OpenAIService
 from .gemini_service import GeminiService
@@ -35,8 +36,8 @@ class AIServiceManager:
         # Track available services
         self.available_services = self._detect_available_services()
         
-        logger.info(f"🚀 AI Service Manager initialized")
-        logger.info(f"📊 Available models: {', '.join(self.available_services)}")
+        logger.info("🚀 AI Service Manager initialized")
+        logger.info("📊 Available models: %s", ', '.join(self.available_services))
     
     def _detect_available_services(self) -> List[str]:
         """Detect which AI services are available based on API keys"""
@@ -51,10 +52,64 @@ class AIServiceManager:
             services.append("Perplexity")
         return services
     
+    async def aclose(self):
+        """Release the pooled HTTP clients of the services"""
+        await asyncio.gather(self.gemini.aclose(), self.perplexity.aclose())
+    
     def get_available_models(self) -> List[str]:
         """Return list of available model names"""
         return self.available_services.copy()
     
+    async def validate_all_keys_async(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """
+        Check every configured API key against its provider in parallel
+        
+        Hits each provider's model-listing endpoint; only an explicit
+        401/403 marks a key invalid, network errors are not held against it.
+        Perplexity has no listing endpoint, so its key is trusted as configured.
+        
+        Returns:
+            Dict mapping model name to whether its key was accepted
+        """
+        probes = {}
+        if self.openai.available:
+            probes["ChatGPT-4"] = (
+                "https://api.openai.com/v1/models",
+                {"Authorization": f"Bearer {self.openai.api_key}"},
+                None
+            )
+        if self.gemini.available:
+            probes["Gemini-Pro"] = (self.gemini.base_url, {}, {"key": self.gemini.api_key})
+        if self.claude.available:
+            probes["Claude-3"] = (
+                "https://api.anthropic.com/v1/models",
+                {"x-api-key": self.claude.api_key, "anthropic-version": "2023-06-01"},
+                None
+            )
+        
+        async def probe(client: httpx.AsyncClient, model_name: str, url: str, headers: dict, params: Optional[dict]) -> bool:
+            try:
+                response = await client.get(url, headers=headers, params=params)
+            except httpx.HTTPError as e:
+                logger.warning("⚠️  Could not reach %s to validate key: %.100s", model_name, e)
+                return True
+            
+            if response.status_code in (401, 403):
+                logger.error("❌ %s API key rejected (%s)", model_name, response.status_code)
+                return False
+            return True
+        
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            results = await asyncio.gather(*[
+                probe(client, model_name, url, headers, params)
+                for model_name, (url, headers, params) in probes.items()
+            ])
+        
+        validity = dict(zip(probes, results))
+        if self.perplexity.available:
+            validity["Perplexity"] = True
+        return validity
+    
     async def query_all(
         self,
         prompt: str,
@@ -81,7 +136,7 @@ class AIServiceManager:
         if self.openai.available:
             cached = get_cached_response(prompt, "ChatGPT-4")
             if cached:
-                logger.info(f"✅ Cache HIT for ChatGPT-4")
+                logger.info("✅ Cache HIT for %s", "ChatGPT-4")
                 response_map["ChatGPT-4"] = cached
             else:
                 tasks.append(self.openai.query(prompt, temperature=temperature, max_tokens=max_tokens))
@@ -90,7 +145,7 @@ class AIServiceManager:
         if self.gemini.available:
             cached = get_cached_response(prompt, "Gemini-Pro")
             if cached:
-                logger.info(f"✅ Cache HIT for Gemini-Pro")
+                logger.info("✅ Cache HIT for %s", "Gemini-Pro")
                 response_map["Gemini-Pro"] = cached
             else:
                 tasks.append(self.gemini.query(prompt, temperature=temperature, max_tokens=max_tokens))
@@ -99,7 +154,7 @@ class AIServiceManager:
         if self.claude.available:
             cached = get_cached_response(prompt, "Claude-3")
             if cached:
-                logger.info(f"✅ Cache HIT for Claude-3")
+                logger.info("✅ Cache HIT for %s", "Claude-3")
                 response_map["Claude-3"] = cached
             else:
                 tasks.append(self.claude.query(prompt, temperature=temperature, max_tokens=max_tokens))
@@ -108,7 +163,7 @@ class AIServiceManager:
         if self.perplexity.available:
             cached = get_cached_response(prompt, "Perplexity")
             if cached:
-                logger.info(f"✅ Cache HIT for Perplexity")
+                logger.info("✅ Cache HIT for %s", "Perplexity")
                 response_map["Perplexity"] = cached
             else:
                 tasks.append(self.perplexity.query(prompt, temperature=temperature, max_tokens=max_tokens))
@@ -120,13 +175,13 @@ class AIServiceManager:
         
         # Execute only non-cached queries in parallel
         if tasks:
-            logger.info(f"🔄 Querying {len(tasks)} models in parallel (+ {len(response_map)} from cache)...")
+            logger.info("🔄 Querying %d models in parallel (+ %d from cache)...", len(tasks), len(response_map))
             results = await asyncio.gather(*tasks, return_exceptions=True)
             
             # Map results to model names and cache
             for model_name, result in zip(model_names, results):
                 if isinstance(result, Exception):
-                    logger.error(f"❌ {model_name} raised exception: {result}")
+                    logger.error("❌ %s raised exception: %s", model_name, result)
                     response_map[model_name] = {
                         "provider": model_name.lower().split('-')[0],
                         "model": model_name,
@@ -138,7 +193,7 @@ class AIServiceManager:
                     # Cache successful responses
                     if result.get('success'):
                         cache_response(prompt, model_name, result)
-                        logger.info(f"💾 Cached response for {model_name}")
+                        logger.info("💾 Cached response for %s", model_name)
                     response_map[model_name] = result
         
         return response_map
@@ -215,13 +270,13 @@ class AIServiceManager:
         if self.gemini.available:
             result = await self.gemini.classify_industry(brand_name, website_text)
             if result != "Other":
-                logger.info(f"✅ Industry classified via Gemini: {result}")
+                logger.info("✅ Industry classified via Gemini: %s", result)
                 return result
         
         # Fallback to OpenAI
         if self.openai.available:
             result = await self.openai.classify_industry(brand_name, website_text)
-            logger.info(f"✅ Industry classified via OpenAI: {result}")
+            logger.info("✅ Industry classified via OpenAI: %s", result)
             return result
         
         # Ultimate fallback
@@ -3,19 +3,76 @@ Structured Logging Utility
 Production-grade logging with timestamps and context
 """
 
+import json
 import logging
+import os
+import random
+import re
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
+# Leading emoji (plus variation selectors / joiners) on human-oriented messages
+EMOJI_PREFIX = re.compile(r'^\s*([\u2600-\u27BF\U0001F000-\U0001FAFF\uFE0F\u200D]+)\s*')
 
-def setup_logger(name: str = "ai_visibility", level: str = "INFO") -> logging.Logger:
+# Attributes every LogRecord has; anything else came in via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with emoji prefixes moved into their own field"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        
+        match = EMOJI_PREFIX.match(message)
+        if match:
+            entry['emoji'] = match.group(1)
+            message = message[match.end():]
+        entry['message'] = message
+        
+        # Structured fields passed with `extra=`
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class Sampler(logging.Filter):
+    """Keep every WARNING and above, but only a fraction of DEBUG/INFO records"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def setup_logger(
+    name: str = "ai_visibility",
+    level: str = "INFO",
+    json_logs: Optional[bool] = None,
+    sample_rate: Optional[float] = None
+) -> logging.Logger:
     """
     Setup structured logger with console and file handlers
     
     Args:
         name: Logger name
         level: Log level (DEBUG, INFO, WARNING, ERROR)
+        json_logs: Emit JSON lines (defaults to LOG_FORMAT, or JSON outside development)
+        sample_rate: Fraction of DEBUG/INFO records kept (defaults to LOG_SAMPLE_RATE, or 1.0)
         
     Returns:
         Configured logger instance
@@ -26,8 +83,17 @@ def setup_logger(name: str = "ai_visibility", level: str = "INFO") -> logging.Lo
     if logger.handlers:
         return logger
     
+    if json_logs is None:
+        default_format = 'text' if os.getenv('ENVIRONMENT', 'development') == 'development' else 'json'
+        json_logs = os.getenv('LOG_FORMAT', default_format).lower() == 'json'
+    if sample_rate is None:
+        sample_rate = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+    
     logger.setLevel(getattr(logging, level.upper()))
     
+    if sample_rate < 1.0:
+        logger.addFilter(Sampler(sample_rate))
+    
     # Console handler with colored output
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
@@ -51,6 +117,9 @@ def setup_logger(name: str = "ai_visibility", level: str = "INFO") -> logging.Lo
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
+    if json_logs:
+        console_format = file_format = JSONFormatter()
+    
     console_handler.setFormatter(console_format)
     file_handler.setFormatter(file_format)
     
@@ -0,0 +1,36 @@
+"""
+Celery Application
+Distributed job processing with Redis as broker and result backend
+
+Run workers with:
+    celery -A backend.workers.celery_app worker -Q analysis --concurrency=8 -Ofair
+"""
+
+import os
+from celery import Celery
+from dotenv import load_dotenv
+
+# Workers start outside the API process, so load .env here too
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+celery_app = Celery(
+    "ai_visibility",
+    broker=REDIS_URL,
+    backend=REDIS_URL,
+    include=["backend.workers.tasks"]
+)
+
+# Analysis jobs are long-running LLM fan-outs: pull one task at a time so
+# queued jobs go to the next free worker instead of sitting in a prefetch buffer
+celery_app.conf.update(
+    task_default_queue='analysis',
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Redis redelivers unacked tasks after this timeout, so it must exceed a full job run
+    broker_transport_options={'visibility_timeout': 3600},
+    # Job state lives in the database; don't keep task results around indefinitely
+    result_expires=3600,
+)
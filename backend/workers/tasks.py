@@ -1,14 +1,19 @@
 """
 Background Task Processing
-Async job processing without Celery (simpler for MVP)
+Analysis jobs run as Celery tasks on a dedicated worker pool
 """
 
 import asyncio
+from collections import Counter
 from datetime import datetime
 from sqlalchemy.orm import Session
 import logging
+import hashlib
 import json
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 
+from .celery_app import celery_app, REDIS_URL
 from ..db.database import SessionLocal
 from ..db.models import AnalysisJob, Result, Query
 from ..core.industry_detector import IndustryDetector
@@ -19,6 +24,54 @@ from ..utils.logger import setup_logger
 
 logger = setup_logger("worker")
 
+# Progress snapshots outlive the job just long enough for late subscribers
+JOB_STATUS_TTL = 3600
+
+# Upper bound on how long a (brand, url) stays locked if a worker never releases it
+ANALYSIS_LOCK_TTL = 3600
+
+# Queries tested against the models at once, and how long one may take
+QUERY_CONCURRENCY = 5
+QUERY_TIMEOUT = 20.0
+
+
+def analysis_lock_key(brand_name: str, website_url: str) -> str:
+    """Redis key that dedupes concurrent analyses of the same brand and site"""
+    digest = hashlib.sha1(f"{brand_name.strip().lower()}|{website_url.strip().lower()}".encode()).hexdigest()
+    return f"lock:{digest}"
+
+
+async def release_analysis_lock(redis, job_id: str, brand_name: str, website_url: str):
+    """Drop the dedupe lock, unless it has since been taken by another job"""
+    key = analysis_lock_key(brand_name, website_url)
+    try:
+        holder = await redis.get(key)
+        if holder and holder.decode() == job_id:
+            await redis.delete(key)
+    except RedisError as e:
+        logger.warning("[%s] Could not release analysis lock: %s", job_id, e)
+
+
+async def publish_job_status(redis, job: AnalysisJob):
+    """
+    Store the job snapshot in Redis and notify WebSocket subscribers
+    """
+    key = f"job:{job.job_id}"
+    snapshot = json.dumps(job.to_dict())
+    try:
+        # One round trip per progress update
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={
+                'status': job.status,
+                'progress': job.progress,
+                'snapshot': snapshot
+            })
+            pipe.expire(key, JOB_STATUS_TTL)
+            pipe.publish(key, snapshot)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("[%s] Could not publish progress: %s", job.job_id, e)
+
 
 async def process_analysis_job_async(
     job_id: str,
@@ -30,6 +83,9 @@ async def process_analysis_job_async(
     Main async processing function
     """
     db = SessionLocal()
+    # asyncio.run() gives every job a fresh loop, so the client is per-job too
+    redis = aioredis.from_url(REDIS_URL)
+    service_manager = None
     
     try:
         # Update job status
@@ -40,19 +96,24 @@ async def process_analysis_job_async(
         job.status = 'processing'
         job.progress = 5
         db.commit()
+        await publish_job_status(redis, job)
         
         # Step 1: Detect Industry (10%)
-        logger.info(f"[{job_id}] Step 1: Detecting industry...")
+        logger.info("[%s] Step 1: Detecting industry...", job_id)
         detector = IndustryDetector()
-        industry = detector.detect_industry(brand_name, website_url)
+        try:
+            industry = await detector.detect_industry(brand_name, website_url)
+        finally:
+            await detector.aclose()
         
         job.industry = industry
         job.progress = 15
         db.commit()
-        logger.info(f"[{job_id}] Industry detected: {industry}")
+        await publish_job_status(redis, job)
+        logger.info("[%s] Industry detected: %s", job_id, industry)
         
         # Step 2: Generate Queries (25%)
-        logger.info(f"[{job_id}] Step 2: Generating queries...")
+        logger.info("[%s] Step 2: Generating queries...", job_id)
         generator = QueryGenerator()
         
         # Generate queries with timeout (max 30 seconds)
@@ -62,7 +123,7 @@ async def process_analysis_job_async(
                 timeout=30.0
             )
         except asyncio.TimeoutError:
-            logger.warning(f"[{job_id}] Query generation timeout, using templates only")
+            logger.warning("[%s] Query generation timeout, using templates only", job_id)
             queries = generator.generate_queries(industry, brand_name, query_count // 2)
         
         # Bulk insert queries (faster than one-by-one)
@@ -72,82 +133,91 @@ async def process_analysis_job_async(
         job.progress = 25
         job.total_queries = len(queries)
         db.commit()
-        logger.info(f"[{job_id}] Generated {len(queries)} queries in parallel")
+        await publish_job_status(redis, job)
+        logger.info("[%s] Generated %s queries in parallel", job_id, len(queries))
         
         # Step 3: Test with LLMs (25-90%)
-        logger.info(f"[{job_id}] Step 3: Testing queries across AI models...")
+        logger.info("[%s] Step 3: Testing queries across AI models...", job_id)
         service_manager = AIServiceManager()
         mention_detector = MentionDetector(brand_name)
         
         # Get available models
         available_models = service_manager.get_available_models()
         if not available_models:
-            logger.error(f"[{job_id}] No AI models available!")
+            logger.error("[%s] No AI models available!", job_id)
             job.status = 'failed'
             job.error_message = "No AI API keys configured"
             db.commit()
+            await publish_job_status(redis, job)
             return
         
-        logger.info(f"[{job_id}] Testing with models: {', '.join(available_models)}")
+        logger.info("[%s] Testing with models: %s", job_id, ', '.join(available_models))
         
         total_tests = len(queries)
         completed_tests = 0
+        reported_tests = 0
         results_batch = []
+        pending_responses = []
         
-        # Process in batches of 10 queries (truly parallel)
-        batch_size = 5  # Reduced from 10 for stability
-        for i in range(0, len(queries), batch_size):
-            batch = queries[i:i+batch_size]
+        # Identical queries get the same answers, so each distinct one is asked once
+        occurrences = Counter(queries)
+        
+        # Keep QUERY_CONCURRENCY queries in flight; each one that finishes is
+        # replaced straight away instead of waiting for the slowest of a batch
+        semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+        
+        async def run_query(query_text):
+            async with semaphore:
+                try:
+                    return query_text, await asyncio.wait_for(
+                        service_manager.query_all(query_text),
+                        timeout=QUERY_TIMEOUT
+                    )
+                except Exception as e:
+                    return query_text, e
+        
+        logger.info("[%s] Running %d distinct queries, %d at a time...", job_id, len(occurrences), QUERY_CONCURRENCY)
+        query_tasks = [asyncio.create_task(run_query(q)) for q in occurrences]
+        
+        for next_finished in asyncio.as_completed(query_tasks):
+            query_text, results_dict = await next_finished
+            completed_tests += occurrences[query_text]
             
-            # Create tasks for all queries in batch - TRUE PARALLELISM
-            batch_tasks = []
-            for query_text in batch:
-                batch_tasks.append(service_manager.query_all(query_text))
+            if isinstance(results_dict, asyncio.TimeoutError):
+                logger.warning("[%s] Query timed out, skipping: %.100s", job_id, query_text)
+            elif isinstance(results_dict, Exception):
+                logger.error("[%s] Query failed: %.100s", job_id, results_dict)
+            elif not isinstance(results_dict, dict):
+                logger.error("[%s] Invalid result type: %s", job_id, type(results_dict))
+            else:
+                # Analyzed together at the next save so spaCy NER runs as one batch
+                for model_name, llm_result in results_dict.items():
+                    if not llm_result.get('success'):
+                        logger.debug("[%s] %s failed: %.50s", job_id, model_name, llm_result.get('error') or 'Unknown')
+                        continue
+                    pending_responses.append((query_text, model_name, llm_result))
             
-            # Execute ALL queries in batch simultaneously with timeout
-            try:
-                logger.info(f"[{job_id}] Executing batch of {len(batch)} queries in parallel...")
-                batch_results = await asyncio.wait_for(
-                    asyncio.gather(*batch_tasks, return_exceptions=True),
-                    timeout=20.0  # 20 second timeout per batch
-                )
-            except asyncio.TimeoutError:
-                logger.warning(f"[{job_id}] Batch timeout, skipping...")
-                completed_tests += len(batch)
+            # Save and report every QUERY_CONCURRENCY queries, not on every one
+            if completed_tests - reported_tests < QUERY_CONCURRENCY and completed_tests < total_tests:
                 continue
+            reported_tests = completed_tests
             
-            # Process all results from batch
-            for query_text, results_dict in zip(batch, batch_results):
-                if isinstance(results_dict, Exception):
-                    logger.error(f"[{job_id}] Query failed: {str(results_dict)[:100]}")
-                    completed_tests += 1
-                    continue
+            # Analyze the responses gathered since the last save
+            analyses = mention_detector.analyze_responses([r['response'] for _, _, r in pending_responses])
+            for (response_query, model_name, llm_result), analysis in zip(pending_responses, analyses):
+                # Convert tokens dict to JSON string for SQLite
+                tokens = llm_result.get('tokens')
+                tokens_str = json.dumps(tokens) if tokens else None
                 
-                if not isinstance(results_dict, dict):
-                    logger.error(f"[{job_id}] Invalid result type: {type(results_dict)}")
-                    completed_tests += 1
-                    continue
+                # Get sentiment with fallback for old code
+                sentiment = analysis.get('sentiment', 'N/A')
+                sentiment_score = analysis.get('sentiment_score', 0.5)
                 
-                # Analyze each model's result
-                for model_name, llm_result in results_dict.items():
-                    if not llm_result.get('success'):
-                        logger.debug(f"[{job_id}] {model_name} failed: {llm_result.get('error', 'Unknown')[:50]}")
-                        continue
-                    
-                    analysis = mention_detector.analyze_response(llm_result['response'])
-                    
-                    # Add to batch (bulk insert later)
-                    # Convert tokens dict to JSON string for SQLite
-                    tokens = llm_result.get('tokens')
-                    tokens_str = json.dumps(tokens) if tokens else None
-                    
-                    # Get sentiment with fallback for old code
-                    sentiment = analysis.get('sentiment', 'N/A')
-                    sentiment_score = analysis.get('sentiment_score', 0.5)
-                    
-                    results_batch.append(Result(
+                # Duplicate queries were asked once; record a row per occurrence
+                results_batch.extend(
+                    Result(
                         job_id=job_id,
-                        query_text=query_text,
+                        query_text=response_query,
                         model=model_name,
                         brand_mentioned=analysis['mentioned'],
                         mention_confidence=analysis['confidence'],
@@ -163,29 +233,31 @@ async def process_analysis_job_async(
                         sentiment_score=sentiment_score,
                         error=llm_result.get('error'),
                         citations=llm_result.get('citations')
-                    ))
-                
-                completed_tests += 1
+                    )
+                    for _ in range(occurrences[response_query])
+                )
+            pending_responses = []
             
-            # Bulk insert results for this batch (MUCH FASTER)
+            # Bulk insert results (MUCH FASTER)
             if results_batch:
                 try:
                     db.bulk_save_objects(results_batch)
                     db.commit()
-                    logger.info(f"[{job_id}] Saved {len(results_batch)} results")
+                    logger.info("[%s] Saved %d results", job_id, len(results_batch))
                     results_batch = []
                 except Exception as e:
-                    logger.error(f"[{job_id}] DB error: {str(e)}")
+                    logger.error("[%s] DB error: %s", job_id, e)
                     db.rollback()
             
             # Update progress
             progress = 25 + int((completed_tests / total_tests) * 65)
             job.progress = min(progress, 90)
             db.commit()
-            logger.info(f"[{job_id}] Progress: {job.progress}% ({completed_tests}/{total_tests})")
+            await publish_job_status(redis, job)
+            logger.info("[%s] Progress: %d%% (%d/%d)", job_id, job.progress, completed_tests, total_tests)
         
         # Step 4: Calculate Final Scores (90-100%)
-        logger.info(f"[{job_id}] Step 4: Calculating visibility scores...")
+        logger.info("[%s] Step 4: Calculating visibility scores...", job_id)
         
         all_results = db.query(Result).filter(Result.job_id == job_id).all()
         
@@ -211,19 +283,26 @@ async def process_analysis_job_async(
         job.status = 'completed'
         job.completed_at = datetime.utcnow()
         db.commit()
+        await publish_job_status(redis, job)
         
-        logger.info(f"[{job_id}] ✅ Analysis completed! Score: {scores['overall_score']}")
+        logger.info("[%s] ✅ Analysis completed! Score: %s", job_id, scores['overall_score'])
         
     except Exception as e:
-        logger.error(f"[{job_id}] ❌ Error: {str(e)}")
+        logger.error("[%s] ❌ Error: %s", job_id, e)
         job.status = 'failed'
         job.error_message = str(e)
         db.commit()
+        await publish_job_status(redis, job)
     
     finally:
         db.close()
+        if service_manager is not None:
+            await service_manager.aclose()
+        await release_analysis_lock(redis, job_id, brand_name, website_url)
+        await redis.close()
 
 
+@celery_app.task(acks_late=True)
 def process_analysis_job(
     job_id: str,
     brand_name: str,
@@ -231,7 +310,7 @@ def process_analysis_job(
     query_count: int = 60
 ):
     """
-    Wrapper to run async function in background
+    Celery task wrapper that runs the async pipeline on a worker
     """
     asyncio.run(process_analysis_job_async(
         job_id, brand_name, website_url, query_count
@@ -35,6 +35,11 @@ export interface JobStatus {
   error_message: string | null;
 }
 
+export type JobSummary = Pick<
+  JobStatus,
+  'job_id' | 'brand_name' | 'status' | 'progress' | 'overall_score' | 'created_at'
+>;
+
 export interface Report {
   job_id: string;
   brand_name: string;
@@ -82,8 +87,8 @@ export const api = {
   /**
    * List recent jobs
    */
-  async listJobs(limit: number = 20): Promise<JobStatus[]> {
-    const response = await apiClient.get(`/jobs?limit=${limit}`);
+  async listJobs(limit: number = 20, offset: number = 0): Promise<JobSummary[]> {
+    const response = await apiClient.get(`/jobs?limit=${limit}&offset=${offset}`);
     return response.data;
   },
 };